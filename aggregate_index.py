@@ -0,0 +1,170 @@
+import bisect
+import heapq
+from itertools import accumulate
+from bmwtools.columns import SessionColumns
+from bmwtools.providers import TOP_PROVIDERS, ProviderNormalizer
+from bmwtools.summary import SessionSummary
+
+def _prefix_sums(values):
+    """Cumulative sums with a leading 0, so sum(values[lo:hi]) == sums[hi] - sums[lo]."""
+    return list(accumulate(values, initial=0))
+
+class SparseTable:
+    """Range minimum (or maximum) queries in O(1) after O(n log n) preprocessing."""
+
+    def __init__(self, values, func):
+        self.func = func
+        self.levels = [list(values)]
+        width = 1
+        while 2 * width <= len(values):
+            previous = self.levels[-1]
+            self.levels.append([func(previous[i], previous[i + width]) for i in range(len(previous) - width)])
+            width *= 2
+
+    def query(self, lo, hi):
+        """Aggregate of values[lo:hi], hi must be greater than lo."""
+        level = (hi - lo).bit_length() - 1
+        row = self.levels[level]
+        return self.func(row[lo], row[hi - (1 << level)])
+
+class AggregateIndex:
+    """Aggregates of the dashboard statistics over any date range of a dataset.
+
+    The sessions are sorted by start time once. Cumulative sums and counts per
+    metric, sparse tables for the mileage and the positions of every provider
+    then answer the statistics of any date range with O(log n) lookups instead
+    of scanning the sessions. Results equal calculate_overall_stats and
+    calculate_soc_statistics on the same range, up to floating point rounding
+    of the energy sums. Provider counts equal those of get_session_stats, but
+    providers are normalized over the whole dataset, so a range may label a
+    provider with a different canonical name than get_session_stats does
+    over that range alone. The aggregates are built
+    once, after changing session fields (e.g. with columns.set_field) a new
+    index has to be built.
+    """
+
+    def __init__(self, sessions):
+        self.sessions = sorted(sessions, key=lambda s: s['start_time'])
+        # Derived columns of the sorted sessions, cached with the dataset for everything built on this index
+        self.columns = SessionColumns(self.sessions)
+        self.start_times = self.columns['start_time']
+
+        failed = self.columns['failed']
+        soc_end = self.columns['soc_end']
+        energy_added = self.columns['energy_added_hvb']
+        self.energy_added = _prefix_sums(energy_added)
+        self.energy_from_grid = _prefix_sums(self.columns['energy_from_grid'])
+        self.dc_energy_added = _prefix_sums(added if is_dc else 0 for added, is_dc in zip(energy_added, self.columns['is_dc']))
+        self.failed = _prefix_sums(failed)
+        self.soc_below_80 = _prefix_sums(not f and soc < 80 for soc, f in zip(soc_end, failed))
+        self.soc_exactly_80 = _prefix_sums(not f and soc == 80 for soc, f in zip(soc_end, failed))
+        self.soc_above_80 = _prefix_sums(not f and soc > 80 for soc, f in zip(soc_end, failed))
+        self.soc_exactly_100 = _prefix_sums(not f and soc == 100 for soc, f in zip(soc_end, failed))
+
+        mileage = self.columns['mileage']
+        self.mileage_min = SparseTable(mileage, min)
+        self.mileage_max = SparseTable(mileage, max)
+
+        # Sorted session positions per canonical provider, split by failed and successful sessions
+        # Providers are matched against the providers of this dataset only
+        self.normalizer = ProviderNormalizer()
+        self.failed_providers = {}
+        self.successful_providers = {}
+        for position, (session, is_failed) in enumerate(zip(self.sessions, failed)):
+            provider = self.normalizer.normalize(session['provider'])
+            if provider == 'Unknown':
+                continue
+            positions = self.failed_providers if is_failed else self.successful_providers
+            positions.setdefault(provider, []).append(position)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def range(self, start_date=None, end_date=None):
+        """Slice bounds (lo, hi) of the sessions starting between start_date and end_date (inclusive), either may be open."""
+        lo = bisect.bisect_left(self.start_times, start_date) if start_date else 0
+        hi = bisect.bisect_right(self.start_times, end_date) if end_date else len(self.sessions)
+        return lo, max(lo, hi)
+
+    def sessions_in_range(self, lo, hi):
+        return self.sessions[lo:hi]
+
+    def total_energy(self, lo, hi):
+        """Energy added to the battery by DC and AC sessions, as (dc, ac)."""
+        total = self.energy_added[hi] - self.energy_added[lo]
+        dc = self.dc_energy_added[hi] - self.dc_energy_added[lo]
+        return dc, total - dc
+
+    def mileage_bounds(self, lo, hi):
+        if hi <= lo:
+            return 0, 0
+        return self.mileage_min.query(lo, hi), self.mileage_max.query(lo, hi)
+
+    def overall_stats(self, lo, hi):
+        """Same result as utils.calculate_overall_stats for the sessions in [lo, hi)."""
+        total_energy_added = self.energy_added[hi] - self.energy_added[lo]
+        total_energy_from_grid = self.energy_from_grid[hi] - self.energy_from_grid[lo]
+        mileage_min, mileage_max = self.mileage_bounds(lo, hi)
+        total_distance = mileage_max - mileage_min
+
+        overall_efficiency = (total_energy_added / total_energy_from_grid) if total_energy_from_grid else 0
+        power_consumption_per_100km = (total_energy_from_grid / total_distance) * 100 if total_distance else 0
+        power_consumption_per_100km_without_grid_losses = (total_energy_added / total_distance) * 100 if total_distance else 0
+        return overall_efficiency, power_consumption_per_100km, power_consumption_per_100km_without_grid_losses
+
+    def soc_statistics(self, lo, hi):
+        """Same result as check_endSoC.calculate_soc_statistics for the sessions in [lo, hi)."""
+        return {
+            'total_sessions': hi - lo,
+            'failed_sessions': self.failed[hi] - self.failed[lo],
+            'below_80_count': self.soc_below_80[hi] - self.soc_below_80[lo],
+            'exactly_80_count': self.soc_exactly_80[hi] - self.soc_exactly_80[lo],
+            'above_80_count': self.soc_above_80[hi] - self.soc_above_80[lo],
+            'exactly_100_count': self.soc_exactly_100[hi] - self.soc_exactly_100[lo]
+        }
+
+    def summary(self, lo, hi):
+        """Same result as bmwtools.summary.summarize_sessions for the sessions in [lo, hi)."""
+        dc_energy_added, ac_energy_added = self.total_energy(lo, hi)
+        mileage_min, mileage_max = self.mileage_bounds(lo, hi)
+        return SessionSummary(
+            total_sessions=hi - lo,
+            failed_sessions=self.failed[hi] - self.failed[lo],
+            dc_energy_added=dc_energy_added,
+            ac_energy_added=ac_energy_added,
+            energy_from_grid=self.energy_from_grid[hi] - self.energy_from_grid[lo],
+            mileage_min=mileage_min,
+            mileage_max=mileage_max,
+            soc_below_80=self.soc_below_80[hi] - self.soc_below_80[lo],
+            soc_exactly_80=self.soc_exactly_80[hi] - self.soc_exactly_80[lo],
+            soc_above_80=self.soc_above_80[hi] - self.soc_above_80[lo],
+            soc_exactly_100=self.soc_exactly_100[hi] - self.soc_exactly_100[lo]
+        )
+
+    def _top_providers(self, provider_positions, lo, hi, n):
+        counts = []
+        for provider, positions in provider_positions.items():
+            first = bisect.bisect_left(positions, lo)
+            count = bisect.bisect_left(positions, hi) - first
+            if count:
+                # Ties keep the order of first appearance in the range, like a stable sort would
+                counts.append((count, -positions[first], provider))
+        return [(provider, count) for count, _, provider in heapq.nlargest(n, counts)]
+
+    def provider_sites(self, provider, lo, hi, failed):
+        """Number of distinct charging sites (sites.assign_sites) of the failed or successful sessions of a canonical provider in [lo, hi)."""
+        positions = (self.failed_providers if failed else self.successful_providers).get(provider, [])
+        sites = {self.sessions[position].get('site_id') for position in positions[bisect.bisect_left(positions, lo):bisect.bisect_left(positions, hi)]}
+        sites.discard(None)
+        return len(sites)
+
+    def session_stats(self, lo, hi, top_n=TOP_PROVIDERS):
+        """Result of successful_failed_sessions.get_session_stats for the sessions in [lo, hi), with providers normalized over the dataset."""
+        total_failed_sessions = self.failed[hi] - self.failed[lo]
+        return {
+            'total_sessions': hi - lo,
+            'total_failed_sessions': total_failed_sessions,
+            'total_successful_sessions': hi - lo - total_failed_sessions,
+            'top_failed_providers': self._top_providers(self.failed_providers, lo, hi, top_n),
+            'top_successful_providers': self._top_providers(self.successful_providers, lo, hi, top_n)
+        }
@@ -0,0 +1,443 @@
+import argparse
+import datetime
+import json
+import sys
+from bmwtools import jsonio
+from bmwtools.sessions import iter_sessions, is_dc_session
+from bmwtools.ingest import ARCHIVE_EXTENSIONS, CHUNK_SESSIONS, open_archive, iter_processed_chunks
+from bmwtools.providers import ProviderNames
+from bmwtools.provider_cube import ProviderCube
+from arrow_store import PARQUET_EXTENSIONS, IPC_EXTENSIONS, read_sessions
+
+# Registry of metric accumulators by name, filled by @register_accumulator
+ACCUMULATORS = {}
+
+# Peak block power (kW) at or above which a session counts as a high power charge
+PEAK_POWER_THRESHOLD_KW = 100
+
+# Peak block power (kW) up to which a DC session counts as charging below one C
+DC_BELOW_ONE_C_MAX_KW = 80
+
+# Minimum energy added (kWh) for a session to be considered in the wasted energy statistics
+WASTED_ENERGY_MIN_KWH = 5
+
+def register_accumulator(name):
+    """Register an Accumulator subclass under the given metric name."""
+    def decorator(cls):
+        cls.name = name
+        ACCUMULATORS[name] = cls
+        return cls
+    return decorator
+
+class Accumulator:
+    """Base class for a metric computed incrementally over normalized sessions.
+
+    Accumulators only keep JSON compatible state in their attributes, so that
+    partial results can be merged across files, chunks or worker processes and
+    persisted with state() / from_state().
+    """
+    name = None
+
+    def add(self, session):
+        raise NotImplementedError
+
+    def merge(self, other):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+    def state(self):
+        return json.loads(json.dumps(vars(self)))
+
+    @classmethod
+    def from_state(cls, state):
+        accumulator = cls()
+        vars(accumulator).update(state)
+        return accumulator
+
+def _merge_counts(target, source):
+    for key, count in source.items():
+        target[key] = target.get(key, 0) + count
+
+def _min(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+@register_accumulator('energy')
+class EnergyAccumulator(Accumulator):
+    """Energy charged and lost per charging type (replaces energy.py, energy_bar.py and energy_ac_dc.py)."""
+
+    def __init__(self):
+        self.ac_sessions = 0
+        self.dc_sessions = 0
+        self.dc_below_one_c_sessions = 0
+        self.ac_energy_added = 0.0
+        self.dc_energy_added = 0.0
+        self.ac_energy_from_grid = 0.0
+        self.dc_energy_from_grid = 0.0
+        self.dc_below_one_c_energy_from_grid = 0.0
+        self.ac_energy_wasted = 0.0
+        self.dc_energy_wasted = 0.0
+
+    def add(self, session):
+        wasted = abs(session['energy_from_grid'] - session['energy_added_hvb'])
+        if is_dc_session(session):
+            self.dc_sessions += 1
+            self.dc_energy_added += session['energy_added_hvb']
+            self.dc_energy_from_grid += session['energy_from_grid']
+            self.dc_energy_wasted += wasted
+            if max(session['grid_power_start'], default=0) <= DC_BELOW_ONE_C_MAX_KW:
+                self.dc_below_one_c_sessions += 1
+                self.dc_below_one_c_energy_from_grid += session['energy_from_grid']
+        else:
+            self.ac_sessions += 1
+            self.ac_energy_added += session['energy_added_hvb']
+            self.ac_energy_from_grid += session['energy_from_grid']
+            self.ac_energy_wasted += wasted
+
+    def merge(self, other):
+        for key, value in vars(other).items():
+            setattr(self, key, getattr(self, key) + value)
+
+    def result(self):
+        return dict(vars(self),
+                    total_energy_added=self.ac_energy_added + self.dc_energy_added,
+                    total_energy_from_grid=self.ac_energy_from_grid + self.dc_energy_from_grid,
+                    total_energy_wasted=self.ac_energy_wasted + self.dc_energy_wasted)
+
+@register_accumulator('wasted_energy')
+class WastedEnergyAccumulator(Accumulator):
+    """Charging losses in percent of grid energy per charging type (replaces energy_wasted.py)."""
+
+    def __init__(self):
+        self.sessions = {'AC': 0, 'DC': 0}
+        self.percentage_sum = {'AC': 0.0, 'DC': 0.0}
+
+    def add(self, session):
+        # Estimated energy values would only reproduce the assumed efficiency
+        if session['using_estimated_energy'] or session['energy_added_hvb'] < WASTED_ENERGY_MIN_KWH:
+            return
+        if session['energy_from_grid'] <= 0:
+            return
+        wasted = (session['energy_from_grid'] - session['energy_added_hvb']) / session['energy_from_grid'] * 100
+        if wasted < 0:
+            return
+        charge_type = 'DC' if is_dc_session(session) else 'AC'
+        self.sessions[charge_type] += 1
+        self.percentage_sum[charge_type] += wasted
+
+    def merge(self, other):
+        _merge_counts(self.sessions, other.sessions)
+        _merge_counts(self.percentage_sum, other.percentage_sum)
+
+    def result(self):
+        return {
+            charge_type: {
+                'sessions': count,
+                'average_wasted_percentage': self.percentage_sum[charge_type] / count if count else 0
+            }
+            for charge_type, count in self.sessions.items()
+        }
+
+@register_accumulator('start_soc')
+class StartSocAccumulator(Accumulator):
+    """Start SoC of successful sessions per charging type (replaces average_start_soc.py)."""
+
+    def __init__(self):
+        self.sessions = {'AC': 0, 'DC': 0}
+        self.soc_sum = {'AC': 0, 'DC': 0}
+        self.soc_min = {'AC': None, 'DC': None}
+        self.soc_max = {'AC': None, 'DC': None}
+
+    def add(self, session):
+        if not session['soc_start'] < session['soc_end']:
+            return
+        charge_type = 'DC' if is_dc_session(session) else 'AC'
+        self.sessions[charge_type] += 1
+        self.soc_sum[charge_type] += session['soc_start']
+        self.soc_min[charge_type] = _min(self.soc_min[charge_type], session['soc_start'])
+        self.soc_max[charge_type] = _max(self.soc_max[charge_type], session['soc_start'])
+
+    def merge(self, other):
+        _merge_counts(self.sessions, other.sessions)
+        _merge_counts(self.soc_sum, other.soc_sum)
+        for charge_type in self.sessions:
+            self.soc_min[charge_type] = _min(self.soc_min[charge_type], other.soc_min[charge_type])
+            self.soc_max[charge_type] = _max(self.soc_max[charge_type], other.soc_max[charge_type])
+
+    def result(self):
+        return {
+            charge_type: {
+                'sessions': count,
+                'average_start_soc': self.soc_sum[charge_type] / count if count else None,
+                'lowest_start_soc': self.soc_min[charge_type],
+                'highest_start_soc': self.soc_max[charge_type]
+            }
+            for charge_type, count in self.sessions.items()
+        }
+
+@register_accumulator('end_soc')
+class EndSocAccumulator(Accumulator):
+    """End SoC buckets, same numbers as check_endSoC.calculate_soc_statistics."""
+
+    def __init__(self):
+        self.total_sessions = 0
+        self.failed_sessions = 0
+        self.below_80_count = 0
+        self.exactly_80_count = 0
+        self.above_80_count = 0
+        self.exactly_100_count = 0
+
+    def add(self, session):
+        self.total_sessions += 1
+        soc = session['soc_end']
+        if soc == session['soc_start']:
+            self.failed_sessions += 1
+            return
+        if soc < 80:
+            self.below_80_count += 1
+        elif soc == 80:
+            self.exactly_80_count += 1
+        else:
+            self.above_80_count += 1
+        if soc == 100:
+            self.exactly_100_count += 1
+
+    def merge(self, other):
+        for key, value in vars(other).items():
+            setattr(self, key, getattr(self, key) + value)
+
+    def result(self):
+        return dict(vars(self))
+
+@register_accumulator('providers')
+class ProviderAccumulator(Accumulator):
+    """Successful and failed sessions per provider (replaces failed_sessions.py).
+
+    Sessions are counted per raw provider name, which are only normalized
+    for the result, by a normalizer of this report alone.
+    """
+
+    def __init__(self):
+        self.failed = {}
+        self.successful = {}
+
+    def add(self, session):
+        counts = self.failed if session['soc_end'] == session['soc_start'] else self.successful
+        counts[session['provider']] = counts.get(session['provider'], 0) + 1
+
+    def merge(self, other):
+        _merge_counts(self.failed, other.failed)
+        _merge_counts(self.successful, other.successful)
+
+    def result(self):
+        names = ProviderNames()
+        for provider in (*self.failed, *self.successful):
+            names.add(provider)
+        failed = names.canonical_counts(self.failed)
+        successful = names.canonical_counts(self.successful)
+        providers = sorted(set(failed) | set(successful))
+        return {
+            provider: {
+                'failed_sessions': failed.get(provider, 0),
+                'successful_sessions': successful.get(provider, 0),
+                'success_rate': successful.get(provider, 0) / (failed.get(provider, 0) + successful.get(provider, 0))
+            }
+            for provider in providers
+        }
+
+@register_accumulator('provider_cube')
+class ProviderCubeAccumulator(Accumulator):
+    """Sessions, energy, cost and duration per provider, month, charge type and success (bmwtools.provider_cube)."""
+
+    def __init__(self):
+        self.cube = ProviderCube()
+
+    def add(self, session):
+        self.cube.add(session)
+
+    def merge(self, other):
+        self.cube.merge(other.cube)
+
+    def result(self):
+        return self.cube.rows()
+
+    def state(self):
+        return self.cube.state()
+
+    @classmethod
+    def from_state(cls, state):
+        accumulator = cls()
+        accumulator.cube = ProviderCube.from_state(state)
+        return accumulator
+
+@register_accumulator('peak_power')
+class PeakPowerAccumulator(Accumulator):
+    """Peak block power of high power sessions (replaces peakrates.py)."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.peak_sum = 0.0
+        self.peak_max = None
+        self.peak_max_date = None
+
+    def add(self, session):
+        peak = max(session['grid_power_start'], default=0)
+        if peak < PEAK_POWER_THRESHOLD_KW:
+            return
+        self.sessions += 1
+        self.peak_sum += peak
+        if self.peak_max is None or peak > self.peak_max:
+            self.peak_max = peak
+            self.peak_max_date = session['start_time'].isoformat()
+
+    def merge(self, other):
+        self.sessions += other.sessions
+        self.peak_sum += other.peak_sum
+        if other.peak_max is not None and (self.peak_max is None or other.peak_max > self.peak_max):
+            self.peak_max = other.peak_max
+            self.peak_max_date = other.peak_max_date
+
+    def result(self):
+        return {
+            'sessions': self.sessions,
+            'average_peak_kw': self.peak_sum / self.sessions if self.sessions else None,
+            'highest_peak_kw': self.peak_max,
+            'highest_peak_date': self.peak_max_date
+        }
+
+@register_accumulator('overall')
+class OverallAccumulator(Accumulator):
+    """Overall efficiency and consumption, same numbers as utils.calculate_overall_stats."""
+
+    def __init__(self):
+        self.energy_added = 0.0
+        self.energy_from_grid = 0.0
+        self.mileage_min = None
+        self.mileage_max = None
+
+    def add(self, session):
+        self.energy_added += session['energy_added_hvb']
+        self.energy_from_grid += session['energy_from_grid']
+        self.mileage_min = _min(self.mileage_min, session['mileage'])
+        self.mileage_max = _max(self.mileage_max, session['mileage'])
+
+    def merge(self, other):
+        self.energy_added += other.energy_added
+        self.energy_from_grid += other.energy_from_grid
+        self.mileage_min = _min(self.mileage_min, other.mileage_min)
+        self.mileage_max = _max(self.mileage_max, other.mileage_max)
+
+    def result(self):
+        distance = self.mileage_max - self.mileage_min if self.mileage_max is not None else 0
+        return {
+            'overall_efficiency': self.energy_added / self.energy_from_grid if self.energy_from_grid else 0,
+            'power_consumption_per_100km': self.energy_from_grid / distance * 100 if distance else 0,
+            'power_consumption_per_100km_without_grid_losses': self.energy_added / distance * 100 if distance else 0,
+            'distance_km': distance
+        }
+
+@register_accumulator('soh')
+class SohAccumulator(Accumulator):
+    """Estimated battery capacity points, same rule as utils.calculate_estimated_battery_capacity."""
+
+    def __init__(self):
+        self.points = []
+
+    def add(self, session):
+        if session['energy_added_hvb'] < 30:
+            return
+        soc_change = session['soc_end'] - session['soc_start']
+        capacity = session['energy_added_hvb'] * 100 / soc_change if soc_change != 0 else 0
+        self.points.append([session['start_time'].isoformat(), capacity, soc_change])
+
+    def merge(self, other):
+        self.points.extend(other.points)
+
+    def result(self):
+        return [
+            {'date': date, 'estimated_battery_capacity': capacity, 'soc_change': soc_change}
+            for date, capacity, soc_change in sorted(self.points)
+        ]
+
+# Function to instantiate the requested accumulators (all registered ones by default)
+def create_accumulators(metrics=None):
+    names = metrics or list(ACCUMULATORS)
+    unknown = [name for name in names if name not in ACCUMULATORS]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+    return {name: ACCUMULATORS[name]() for name in names}
+
+# Function to feed normalized sessions through all accumulators in a single pass, either date bound may be open
+def accumulate(sessions, accumulators, start_date=None, end_date=None):
+    accumulators = list(accumulators.values())
+    for session in sessions:
+        if start_date and session['start_time'] < start_date:
+            continue
+        if end_date and session['start_time'] > end_date:
+            continue
+        for accumulator in accumulators:
+            accumulator.add(session)
+
+# Function to run the analytics engine over normalized sessions
+def analyze_sessions(sessions, metrics=None, start_date=None, end_date=None):
+    accumulators = create_accumulators(metrics)
+    accumulate(sessions, accumulators, start_date, end_date)
+    return accumulators
+
+# Function to run the analytics engine over raw CarData sessions
+def analyze_data(data, metrics=None, start_date=None, end_date=None):
+    return analyze_sessions(iter_sessions(data), metrics, start_date, end_date)
+
+# Function to run the analytics engine over an archive read in chunks (bmwtools.ingest), with bounded memory
+def analyze_archive(file, metrics=None, start_date=None, end_date=None, chunk_sessions=CHUNK_SESSIONS):
+    accumulators = create_accumulators(metrics)
+    for sessions, _ in iter_processed_chunks(file, chunk_sessions):
+        accumulate(sessions, accumulators, start_date, end_date)
+    return accumulators
+
+# Function to merge accumulators of the same metrics, e.g. from several files
+def merge_accumulators(target, source):
+    for name, accumulator in source.items():
+        target[name].merge(accumulator)
+    return target
+
+def build_report(accumulators):
+    return {name: accumulator.result() for name, accumulator in accumulators.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute charging statistics for BMW CarData exports in a single pass.')
+    parser.add_argument('files', nargs='+', help='CarData JSON exports (BMW-CarData-Ladehistorie_*.json), NDJSON archives, normalized Parquet/Arrow session files or - for an archive on stdin')
+    parser.add_argument('--metrics', help=f"Comma separated metrics to compute (default: all of {', '.join(ACCUMULATORS)})")
+    parser.add_argument('--start-date', type=datetime.datetime.fromisoformat, help='Only include sessions starting at or after this date')
+    parser.add_argument('--end-date', type=datetime.datetime.fromisoformat, help='Only include sessions starting at or before this date')
+    parser.add_argument('--stream', action='store_true', help=f"Read every JSON file in chunks instead of loading it at once (always done for {', '.join(ARCHIVE_EXTENSIONS)})")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SESSIONS, help='Sessions per chunk when reading in chunks')
+    args = parser.parse_args(argv)
+
+    metrics = args.metrics.split(',') if args.metrics else None
+    accumulators = create_accumulators(metrics)
+    for file_path in args.files:
+        if file_path.lower().endswith(PARQUET_EXTENSIONS + IPC_EXTENSIONS):
+            sessions, _ = read_sessions(file_path)
+            merge_accumulators(accumulators, analyze_sessions(sessions, metrics, args.start_date, args.end_date))
+            continue
+        if file_path == '-':
+            merge_accumulators(accumulators, analyze_archive(sys.stdin, metrics, args.start_date, args.end_date, args.chunk_size))
+            continue
+        if args.stream or file_path.lower().endswith(ARCHIVE_EXTENSIONS):
+            with open_archive(file_path) as f:
+                merge_accumulators(accumulators, analyze_archive(f, metrics, args.start_date, args.end_date, args.chunk_size))
+            continue
+        with open(file_path, 'r') as f:
+            data = jsonio.load(f)
+        merge_accumulators(accumulators, analyze_data(data, metrics, args.start_date, args.end_date))
+
+    jsonio.dump(build_report(accumulators), sys.stdout, indent=2)
+    print()
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,32 @@
 import dash
+import plotly.io as pio
 from dash import dcc, html
 from flask import session
 import uuid
-from callbacks import register_callbacks
+from callbacks import register_callbacks, MAP_MODE_MARKERS, MAP_MODE_AGGREGATED
 from utils import get_disclaimer_with_hash
+from background_jobs import job_cache, job_manager
+from stats_api import stats_api
+import dataset_cache
+import output_diff
+from bmwtools import jsonio
 
-# Initialize Dash app
-app = dash.Dash()
+# Dash serializes callback responses with plotly's JSON engine, use the same backend as for parsing uploads
+pio.json.config.default_engine = jsonio.BACKEND
+
+# Datasets built by background jobs and the outputs sent to each client are shared with the server process through the job cache
+dataset_cache.use_disk_cache(job_cache)
+output_diff.use_disk_cache(job_cache)
+
+# Initialize Dash app, uploads are processed as background jobs and responses are compressed (gzip/brotli, with flask-compress)
+app = dash.Dash(background_callback_manager=job_manager, compress=True)
 app.title = 'BMW CarData - Charging Session Dashboard'
 app.css.config.serve_locally = True
 app.scripts.config.serve_locally = True
 
+# JSON statistics API next to the dashboard (/api/stats)
+app.server.register_blueprint(stats_api)
+
 # Set maximum file upload size (e.g., 5MB)
 app.server.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024
 app.server.secret_key = str(uuid.uuid4())  # Set a secret key for session management
@@ -23,7 +39,7 @@ def make_session_permanent():
         session['session_id'] = str(uuid.uuid4())
 
 # Layout
-app.layout = html.Div([
+dashboard_layout = html.Div([
     html.H1('BMW CarData - Charging Session Dashboard', style={'textAlign': 'center', 'color': '#1f77b4'}),
 
     # Disclaimer
@@ -64,9 +80,27 @@ app.layout = html.Div([
         html.Button('Load Demo Data', id='load-demo-data', n_clicks=0, style={'marginBottom': '10px'})  # Reduced margin
     ], style={'textAlign': 'center'}),
 
+    # Progress of the upload job, shown while it is running
+    html.Div([
+        html.Div(id='upload-status'),
+        html.Progress(id='upload-progress', value='0', max='1'),
+        html.Button('Cancel', id='cancel-upload', n_clicks=0, disabled=True, style={'marginLeft': '10px'})
+    ], id='upload-progress-container', style={'display': 'none'}),
+
     # Store component to hold session data
     dcc.Store(id='session-data'),
 
+    # Store component to reference the dataset and date range cached on the server
+    dcc.Store(id='dataset-handle'),
+
+    # Store component with the id of the last upload response the browser received, later outputs are diffed against it
+    dcc.Store(id='outputs-token'),
+
+    # Store components for the clientside callbacks: driven distance in km, map of all sessions and figure template
+    dcc.Store(id='driven-distance'),
+    dcc.Store(id='range-map-template'),
+    dcc.Store(id='plotly-template', data=pio.templates['plotly_white'].to_plotly_json()),
+
     # Datepicker to select time range
     html.Div([
         html.Label('Select Date Range for analysis (optional):', style={'fontWeight': 'bold', 'color': '#1f77b4'}),
@@ -146,6 +180,16 @@ app.layout = html.Div([
 
     # Second map for charging locations
     html.Div([
+        dcc.RadioItems(
+            id='map-mode',
+            options=[
+                {'label': 'Charging locations', 'value': MAP_MODE_MARKERS},
+                {'label': 'Aggregated (sessions per area)', 'value': MAP_MODE_AGGREGATED}
+            ],
+            value=MAP_MODE_MARKERS,
+            inline=True,
+            style={'textAlign': 'center', 'marginBottom': '5px'}
+        ),
         html.Iframe(id='charging-locations-map', style={'width': '100%', 'height': '400px', 'border': '2px solid #1f77b4', 'borderRadius': '10px', 'marginBottom': '10px'})  # Reduced margin
     ], style={'marginBottom': '10px'}),  # Reduced margin
 
@@ -156,6 +200,7 @@ app.layout = html.Div([
             id='session-dropdown',
             options=[],
             value=None,
+            placeholder='Search by date (e.g. 2024-05) or location',
             style={'border': '2px solid #1f77b4', 'borderRadius': '5px'}
         )
     ], style={'width': '50%', 'margin': 'auto', 'marginBottom': '10px'}),  # Reduced margin
@@ -195,6 +240,12 @@ app.layout = html.Div([
     ]),
 ])
 
+# The layout is served per page load, so every page gets its own client id to diff callback outputs against
+def serve_layout():
+    return html.Div([dcc.Store(id='client-id', data=str(uuid.uuid4())), dashboard_layout])
+
+app.layout = serve_layout
+
 # Register callbacks
 register_callbacks(app)
 
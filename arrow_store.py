@@ -0,0 +1,119 @@
+import os
+from functools import lru_cache
+
+# pyarrow is only imported by the functions reading and writing session files, so that JSON-only
+# analytics and batch jobs, which import this module for its extensions, do not need it
+
+# Version of the normalized session schema, bump on incompatible changes
+SCHEMA_VERSION = 3
+
+# Schema versions read_table accepts, version 1 stored SoC and mileage as int64, versions before 3 have no block offsets
+READABLE_SCHEMA_VERSIONS = (1, 2, 3)
+
+SCHEMA_VERSION_KEY = b'bmwtools.schema_version'
+ESTIMATED_VALUES_KEY = b'bmwtools.using_estimated_values'
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+IPC_EXTENSIONS = ('.arrow', '.ipc', '.feather')
+
+# Columns stored as float64 since exports may have fractional values, read back as int when integral
+INTEGRAL_COLUMNS = ('soc_start', 'soc_end', 'mileage')
+
+@lru_cache(maxsize=None)
+def session_schema():
+    """Columns of the sessions produced by utils.process_data, one row per session."""
+    import pyarrow as pa
+    return pa.schema([
+        ('start_time', pa.timestamp('us')),
+        ('end_time', pa.timestamp('us')),
+        ('soc_start', pa.float64()),
+        ('soc_end', pa.float64()),
+        ('energy_from_grid', pa.float64()),
+        ('energy_added_hvb', pa.float64()),
+        ('cost', pa.float64()),
+        ('efficiency', pa.float64()),
+        ('location', pa.string()),
+        ('latitude', pa.float64()),
+        ('longitude', pa.float64()),
+        ('avg_power', pa.float64()),
+        ('grid_power_start', pa.list_(pa.float64())),  # averagePowerGridKw of the charging blocks
+        ('block_offsets', pa.list_(pa.list_(pa.float64()))),  # [start, end] seconds of the charging blocks
+        ('mileage', pa.float64()),
+        ('session_time_minutes', pa.float64()),
+        ('provider', pa.string()),
+        ('using_estimated_energy', pa.bool_()),
+    ])
+
+def sessions_to_table(sessions, using_estimated_values=False):
+    """Convert normalized sessions into an Arrow table carrying the schema version."""
+    import pyarrow as pa
+    schema = session_schema()
+    columns = {field.name: [session.get(field.name) for session in sessions] for field in schema}
+    table = pa.Table.from_pydict(columns, schema=schema)
+    return table.replace_schema_metadata({
+        SCHEMA_VERSION_KEY: str(SCHEMA_VERSION).encode(),
+        ESTIMATED_VALUES_KEY: b'1' if using_estimated_values else b'0',
+    })
+
+def table_to_sessions(table):
+    """Convert an Arrow table back into the session dicts used by the dashboard."""
+    sessions = table.to_pylist()
+    names = [name for name in INTEGRAL_COLUMNS if name in table.column_names]
+    for session in sessions:
+        for name in names:
+            value = session[name]
+            if isinstance(value, float) and value.is_integer():
+                session[name] = int(value)
+    return sessions
+
+def _file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in PARQUET_EXTENSIONS:
+        return 'parquet'
+    if extension in IPC_EXTENSIONS:
+        return 'ipc'
+    raise ValueError(f"Unsupported session file extension '{extension}', use one of {PARQUET_EXTENSIONS + IPC_EXTENSIONS}")
+
+def _check_schema_version(schema, path):
+    metadata = schema.metadata or {}
+    version = metadata.get(SCHEMA_VERSION_KEY)
+    if version is None or int(version) not in READABLE_SCHEMA_VERSIONS:
+        raise ValueError(f"{path} has session schema version {version and int(version)}, expected one of {READABLE_SCHEMA_VERSIONS}")
+
+def write_sessions(sessions, path, using_estimated_values=False):
+    """Write normalized sessions to Parquet or Arrow IPC, depending on the file extension.
+
+    Arrow IPC files are written uncompressed so they can be memory-mapped
+    without a decoding step when they are read back.
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    table = sessions_to_table(sessions, using_estimated_values)
+    temp_path = f"{path}.tmp"
+    if _file_format(path) == 'parquet':
+        pq.write_table(table, temp_path, compression='zstd')
+    else:
+        with pa.OSFile(temp_path, 'wb') as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temp_path, path)
+
+def read_table(path, columns=None, memory_map=True):
+    """Read a session file as Arrow table, optionally projected to a subset of columns."""
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    if _file_format(path) == 'parquet':
+        table = pq.read_table(path, columns=columns, memory_map=memory_map)
+        _check_schema_version(table.schema, path)
+        return table
+    source = pa.memory_map(path, 'r') if memory_map else pa.OSFile(path, 'rb')
+    table = ipc.open_file(source).read_all()
+    _check_schema_version(table.schema, path)
+    return table.select(columns) if columns else table
+
+def read_sessions(path, columns=None, memory_map=True):
+    """Read normalized sessions and the estimated values flag back from a session file."""
+    table = read_table(path, columns, memory_map)
+    using_estimated_values = table.schema.metadata.get(ESTIMATED_VALUES_KEY) == b'1'
+    return table_to_sessions(table), using_estimated_values
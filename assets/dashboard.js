@@ -0,0 +1,169 @@
+// Clientside callbacks of the dashboard. They render the views of a single
+// session and the km/miles conversion from data that is already in the
+// browser, so browsing sessions does not need a server round trip.
+
+const KM_TO_MILES = 0.621371;
+const POWER_SCALE = 100;  // Must match wire_format.POWER_SCALE
+const WIRE_FORMAT_VERSION = 2;  // Must match wire_format.WIRE_FORMAT_VERSION
+const MAP_CENTER_PLACEHOLDER = ['-89.123456', '-179.654321'];  // Must match utils.MAP_CENTER_PLACEHOLDER
+
+// Epoch seconds of the wire format hold the wall-clock time as UTC, plotly takes naive date strings
+function toDateString(epochSeconds) {
+    return new Date(epochSeconds * 1000).toISOString().slice(0, 19).replace('T', ' ');
+}
+
+// Decode a single session of a wire_format.encode_sessions payload
+function decodeSession(payload, i) {
+    const gridPower = payload.p.slice(payload.po[i], payload.po[i + 1]).map(p => p / POWER_SCALE);
+    const blockStarts = payload.bs.slice(payload.po[i], payload.po[i + 1]);
+    const blockEnds = payload.be.slice(payload.po[i], payload.po[i + 1]);
+    const energyFromGrid = payload.eg[i];
+    const energyAddedHvb = payload.eh[i];
+    return {
+        start_time: payload.ts[i],
+        end_time: payload.te[i],
+        soc_start: payload.ss[i],
+        soc_end: payload.se[i],
+        energy_from_grid: energyFromGrid,
+        energy_added_hvb: energyAddedHvb,
+        cost: payload.c[i],
+        efficiency: energyFromGrid ? energyAddedHvb / energyFromGrid : 0,
+        location: payload.ld[payload.l[i]],
+        avg_power: gridPower.reduce((a, b) => a + b, 0) / Math.max(gridPower.length, 1),
+        grid_power_start: gridPower,
+        block_offsets: blockStarts.map((start, j) => start === null || blockEnds[j] === null ? null : [start, blockEnds[j]]),
+        session_time_minutes: (payload.te[i] - payload.ts[i]) / 60
+    };
+}
+
+// Maximum of a per-session value over all sessions of the payload
+function maxOverSessions(payload, value) {
+    let max = -Infinity;
+    for (let i = 0; i < payload.ts.length; i++) {
+        max = Math.max(max, value(i));
+    }
+    return max;
+}
+
+// Same trace as utils.create_gauge_trace
+function gaugeTrace(value, title, color, domainX, domainY, rangeMax) {
+    return {
+        type: 'indicator',
+        mode: 'gauge+number',
+        value: value,
+        title: {text: title, font: {size: 14}},
+        domain: {x: domainX, y: domainY || [0, 1]},
+        gauge: {axis: {range: rangeMax ? [0, rangeMax] : [null, null]}, bar: {color: color}}
+    };
+}
+
+// Same figure as utils.create_scatter_plot without trend line
+function scatterPlot(x, y, title, xaxisTitle, yaxisTitle, color, mode, template) {
+    const data = [{type: 'scatter', x: x, y: y, mode: mode, marker: {size: 10, color: color}, name: title}];
+    if (x.length && y.length) {
+        data.push({
+            type: 'scatter',
+            x: [x[0], x[x.length - 1]],
+            y: [y[0], y[y.length - 1]],
+            mode: 'text',
+            text: [y[0].toFixed(2), y[y.length - 1].toFixed(2)],
+            textposition: 'top center',
+            showlegend: false
+        });
+    }
+    return {
+        data: data,
+        layout: {title: {text: title}, xaxis: {title: {text: xaxisTitle}}, yaxis: {title: {text: yaxisTitle}}, template: template}
+    };
+}
+
+function gridPowerPlot(session, template) {
+    const power = session.grid_power_start;
+    const blocks = session.block_offsets;
+    let x, y, peakX;
+    const peakValue = power.length ? Math.max(...power) : null;
+    const peakIndex = power.indexOf(peakValue);
+    if (power.length && blocks.every(block => block !== null)) {
+        // Every block is drawn from its start to its end time, pauses between blocks stay visible
+        x = [];
+        y = [];
+        blocks.forEach((block, i) => {
+            x.push(toDateString(session.start_time + block[0]), toDateString(session.start_time + block[1]));
+            y.push(power[i], power[i]);
+        });
+        const peakBlock = blocks[peakIndex];
+        peakX = toDateString(session.start_time + (peakBlock[0] + peakBlock[1]) / 2);
+    } else {
+        // Sessions without block times: blocks are spread evenly over the session
+        const step = (session.end_time - session.start_time) / power.length;
+        x = power.map((_, i) => toDateString(session.start_time + i * step));
+        y = power;
+        peakX = x[peakIndex];
+    }
+    const fig = scatterPlot(x, y, 'Grid Power Over Time', 'Time', 'Grid Power (kW)', 'green', 'lines+markers', template);
+    if (power.length) {
+        fig.data.push({
+            type: 'scatter',
+            x: [peakX],
+            y: [peakValue],
+            mode: 'markers+text',
+            marker: {size: 12, color: 'red', symbol: 'x'},
+            text: ['Peak: ' + peakValue.toFixed(2) + ' kW'],
+            textposition: 'bottom center',
+            name: 'Peak'
+        });
+    }
+    return fig;
+}
+
+function combinedGauges(session, payload, template) {
+    const maxAvgPower = maxOverSessions(payload, i => decodeSession(payload, i).avg_power);
+    const maxCost = maxOverSessions(payload, i => payload.c[i]);
+    const maxEnergy = maxOverSessions(payload, i => payload.eh[i]);
+    const maxTime = maxOverSessions(payload, i => (payload.te[i] - payload.ts[i]) / 60);
+    return {
+        data: [
+            gaugeTrace(session.avg_power, 'Average Grid Power (kW)', 'darkblue', [0, 0.45], [0.6, 1], maxAvgPower),
+            gaugeTrace(session.cost, 'Cost (€)', 'green', [0.55, 1], [0.6, 1], maxCost),
+            gaugeTrace(session.efficiency * 100, 'Efficiency (%)', 'orange', [0, 0.45], [0.2, 0.6], 100),
+            gaugeTrace(session.energy_added_hvb, 'Energy Added (kWh)', 'purple', [0.55, 1], [0.2, 0.6], maxEnergy),
+            gaugeTrace(session.session_time_minutes, 'Session Time (minutes)', 'red', [0.25, 0.75], [0, 0.2], maxTime)
+        ],
+        layout: {template: template, height: 800}
+    };
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    bmwtools: {
+        sessionViews: function(selectedSession, mapTemplate, payload, template) {
+            if (selectedSession === null || selectedSession === undefined || !payload || payload.v !== WIRE_FORMAT_VERSION || selectedSession >= payload.ts.length) {
+                return [{}, '', {}, {}, ''];
+            }
+            const session = decodeSession(payload, selectedSession);
+            const chargeDetails = scatterPlot(
+                [toDateString(session.start_time), toDateString(session.end_time)],
+                [session.soc_start, session.soc_end],
+                'Charge Details', 'Time', 'SOC (%)', 'blue', 'lines+markers', template
+            );
+            const sessionInfo = 'Energy Added: ' + session.energy_added_hvb + ' kWh, Cost: €' + session.cost +
+                ', Efficiency: ' + (session.efficiency * 100).toFixed(2) + '%, Location: ' + session.location;
+            const rangeMap = mapTemplate
+                ? mapTemplate.split(MAP_CENTER_PLACEHOLDER[0]).join(String(payload.la[selectedSession]))
+                             .split(MAP_CENTER_PLACEHOLDER[1]).join(String(payload.lo[selectedSession]))
+                : '';
+            return [chargeDetails, sessionInfo, combinedGauges(session, payload, template), gridPowerPlot(session, template), rangeMap];
+        },
+
+        drivenDistanceGauge: function(drivenKm, toggleUnits, template) {
+            if (drivenKm === null || drivenKm === undefined) {
+                return {};
+            }
+            const useMiles = toggleUnits % 2 === 1;
+            const value = useMiles ? drivenKm * KM_TO_MILES : drivenKm;
+            return {
+                data: [gaugeTrace(value, useMiles ? 'Driven miles' : 'Driven km', 'orange', [0, 1], [0, 1], value)],
+                layout: {height: 400, width: 300, template: template}
+            };
+        }
+    }
+});
@@ -1,36 +1,26 @@
-import json
-from collections import defaultdict
-import re
+from bmwtools import jsonio
+from bmwtools.sessions import process_data
+from bmwtools.columns import SessionColumns
 
 # Load the JSON data
 with open('./path_to_your_json_file.json') as f:
-    data = json.load(f)
+    data = jsonio.load(f)
+
+# Charge type and SoC change are the shared derived columns of bmwtools.columns
+sessions, _ = process_data(data)
+columns = SessionColumns(sessions)
 
 # Initialize lists to store startSoc values for successful DC and AC charging sessions
 start_soc_dc_successful = []
 start_soc_ac_successful = []
 
-
-# Loop through each session
-for session in data:
-    # Check if 'displayedSoc' and 'displayedStartSoc' exist in the session
-    if 'displayedSoc' in session and 'displayedStartSoc' in session:
-        soc = session['displayedSoc']
-        start_soc = session['displayedStartSoc']
-        
-        # Check if 'chargingBlocks' exist and is not empty
-        if 'chargingBlocks' in session and session['chargingBlocks']:
-            # Get the max charging power from the charging blocks
-            max_power = max([block['averagePowerGridKw'] for block in session['chargingBlocks']])
-            
-            # Check for successful charging (startSoc < displayedSoc)
-            if start_soc < soc:
-                # DC charging (max power greater than 11kW)
-                if max_power > 11:
-                    start_soc_dc_successful.append(start_soc)
-                # AC charging (max power 11kW or less)
-                elif max_power <= 11:
-                    start_soc_ac_successful.append(start_soc)
+# Successful charging sessions are the ones whose SoC increased
+for start_soc, soc_change, charge_type in zip(columns['soc_start'], columns['soc_change'], columns['charge_type']):
+    if soc_change > 0:
+        if charge_type == 'DC':
+            start_soc_dc_successful.append(start_soc)
+        else:
+            start_soc_ac_successful.append(start_soc)
 
 # Function to calculate and display statistics
 def display_stats(start_soc_list, charging_type):
@@ -0,0 +1,72 @@
+import os
+import time
+import tempfile
+from contextlib import contextmanager
+import diskcache
+from dash import DiskcacheManager
+
+# Directory of the job queue, the job results and the datasets built by jobs
+JOB_CACHE_DIR = os.environ.get('BMWTOOLS_JOB_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'bmwtools-jobs'))
+
+# Number of uploads processed at the same time, further jobs wait for a free worker
+MAX_WORKERS = int(os.environ.get('BMWTOOLS_MAX_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+
+# Seconds between two attempts to get a free worker
+WORKER_POLL_INTERVAL = 0.2
+
+# Processing stages of an upload, reported as progress of the job
+UPLOAD_STAGES = [
+    'Waiting for a free worker',
+    'Parsing sessions',
+    'Building map',
+    'Calculating statistics',
+    'Rendering figures',
+]
+
+_WORKERS_KEY = 'workers'
+
+job_cache = diskcache.Cache(JOB_CACHE_DIR)
+job_manager = DiskcacheManager(job_cache)
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _try_acquire_worker(pid):
+    with diskcache.Lock(job_cache, f"{_WORKERS_KEY}:lock"):
+        # Jobs that were cancelled are killed without releasing their worker
+        workers = [worker for worker in job_cache.get(_WORKERS_KEY, []) if _is_alive(worker)]
+        acquired = len(workers) < MAX_WORKERS
+        if acquired:
+            workers.append(pid)
+        job_cache.set(_WORKERS_KEY, workers)
+    return acquired
+
+def _release_worker(pid):
+    with diskcache.Lock(job_cache, f"{_WORKERS_KEY}:lock"):
+        job_cache.set(_WORKERS_KEY, [worker for worker in job_cache.get(_WORKERS_KEY, []) if worker != pid])
+
+@contextmanager
+def worker_slot():
+    """Block until fewer than MAX_WORKERS jobs are running, and hold a worker for the job.
+
+    Workers are tracked by process id in the job cache, so the limit holds
+    across all job processes and workers of killed jobs are freed again.
+    """
+    pid = os.getpid()
+    while not _try_acquire_worker(pid):
+        time.sleep(WORKER_POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        _release_worker(pid)
+
+# Function to report the stage of an upload job to its progress outputs
+def report_stage(set_progress, stage):
+    position = UPLOAD_STAGES.index(stage)
+    set_progress((str(position), str(len(UPLOAD_STAGES)), f"{stage}..."))
@@ -0,0 +1,174 @@
+import argparse
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from bmwtools import jsonio
+from bmwtools.sessions import process_data
+from analytics import ACCUMULATORS, analyze_sessions, build_report, merge_accumulators
+from arrow_store import write_sessions
+from fleet_soh import FleetSohAggregator
+
+# Model name for vehicles missing from the --models mapping
+UNKNOWN_MODEL = 'unknown'
+
+MANIFEST_FILE = 'manifest.json'
+FLEET_FILE = 'fleet.json'
+VEHICLES_DIR = 'vehicles'
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """Calculate the sha256sum of a file without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def find_exports(directory):
+    """Find all JSON exports below a directory, sorted for a stable processing order."""
+    exports = []
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.lower().endswith('.json'):
+                exports.append(os.path.join(root, file))
+    return sorted(exports)
+
+def vehicle_id(directory, file_path):
+    """Derive a file system friendly vehicle identifier from the export path."""
+    relative_path = os.path.splitext(os.path.relpath(file_path, directory))[0]
+    return relative_path.replace(os.sep, '__')
+
+def load_manifest(output_dir):
+    """Processed exports by vehicle id, each with the SHA256 of the export its report was built from."""
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r') as f:
+        manifest = jsonio.load(f)
+    # Older manifests were keyed by SHA256, with an entry per version of an export; a vehicle whose
+    # stored digest is not the one of its report is just processed once more
+    entries = {}
+    for key, entry in manifest.items():
+        if 'sha256' in entry:
+            entries[key] = entry
+        else:
+            entries[os.path.splitext(os.path.basename(entry['report']))[0]] = dict(entry, sha256=key)
+    return entries
+
+def write_json(path, content):
+    """Write JSON atomically so an interrupted job never leaves a truncated file behind."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        jsonio.dump(content, f, indent=2)
+    os.replace(temp_path, path)
+
+def process_export(file_path, digest, sessions_path=None, model=UNKNOWN_MODEL):
+    """Process a single export in a worker process and return its accumulator states and report.
+
+    If sessions_path is given, the normalized sessions are stored there as
+    Parquet/Arrow so later jobs can reopen them without parsing the export.
+    """
+    with open(file_path, 'r') as f:
+        data = jsonio.load(f)
+    sessions, using_estimated_values = process_data(data)
+    if sessions_path:
+        write_sessions(sessions, sessions_path, using_estimated_values)
+    accumulators = analyze_sessions(sessions)
+    soh = FleetSohAggregator()
+    soh.add_sessions(sessions, model)
+    return {
+        'file': file_path,
+        'sha256': digest,
+        'report': build_report(accumulators),
+        'state': {name: accumulator.state() for name, accumulator in accumulators.items()},
+        'soh_sketches': soh.state()
+    }
+
+def build_fleet_report(output_dir, manifest):
+    """Merge the stored per-vehicle accumulator states into fleet-wide aggregates."""
+    fleet = {name: cls() for name, cls in ACCUMULATORS.items()}
+    fleet_soh = FleetSohAggregator()
+    for entry in manifest.values():
+        with open(os.path.join(output_dir, entry['report']), 'r') as f:
+            vehicle = jsonio.load(f)
+        merge_accumulators(fleet, {name: ACCUMULATORS[name].from_state(value) for name, value in vehicle['state'].items()})
+        # Reports written before SoH sketches existed simply do not contribute to the bands
+        if 'soh_sketches' in vehicle:
+            fleet_soh.merge(FleetSohAggregator.from_state(vehicle['soh_sketches']))
+    report = build_report(fleet)
+    # Individual SoH points of every vehicle would grow without bound, the fleet report has bands instead
+    del report['soh']
+    report['soh_bands'] = {'fleet': fleet_soh.bands()}
+    for model in fleet_soh.models():
+        report['soh_bands'][model] = fleet_soh.bands(model)
+    report['vehicles'] = len(manifest)
+    return report
+
+def run_batch(input_dir, output_dir, workers=None, sessions_format=None, models=None):
+    """Process all new or changed exports of input_dir in a process pool and update the fleet report.
+
+    models optionally maps vehicle ids (the export path relative to input_dir
+    without extension) to model names for the SoH bands per model.
+    """
+    models = models or {}
+    os.makedirs(os.path.join(output_dir, VEHICLES_DIR), exist_ok=True)
+    manifest = load_manifest(output_dir)
+
+    # One entry per vehicle, an updated export replaces the report of its vehicle
+    pending = {}
+    for file_path in find_exports(input_dir):
+        vehicle = vehicle_id(input_dir, file_path)
+        digest = file_sha256(file_path)
+        if manifest.get(vehicle, {}).get('sha256') == digest:
+            continue
+        pending[vehicle] = (file_path, digest)
+    print(f"{len(pending)} new or changed exports, {len(manifest)} vehicles already processed", file=sys.stderr)
+
+    # Output paths are stored relative to output_dir in the manifest
+    sessions_paths = {
+        vehicle: os.path.join(VEHICLES_DIR, f"{vehicle}.{sessions_format}") if sessions_format else None
+        for vehicle in pending
+    }
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for vehicle, (file_path, digest) in pending.items():
+            sessions_path = sessions_paths[vehicle] and os.path.join(output_dir, sessions_paths[vehicle])
+            model = models.get(vehicle, UNKNOWN_MODEL)
+            futures[executor.submit(process_export, file_path, digest, sessions_path, model)] = vehicle
+        for future in as_completed(futures):
+            vehicle = futures[future]
+            try:
+                result = future.result()
+            except (OSError, ValueError, TypeError) as e:
+                # Failed exports keep their previous manifest entry, if any, and are retried on the next run
+                print(f"Skipping {pending[vehicle][0]}: {e}", file=sys.stderr)
+                continue
+
+            report_path = os.path.join(VEHICLES_DIR, f"{vehicle}.json")
+            write_json(os.path.join(output_dir, report_path), {key: result[key] for key in ('file', 'report', 'state', 'soh_sketches')})
+            manifest[vehicle] = {'file': result['file'], 'sha256': result['sha256'], 'report': report_path, 'sessions': sessions_paths[vehicle]}
+            write_json(os.path.join(output_dir, MANIFEST_FILE), manifest)
+
+    fleet_report = build_fleet_report(output_dir, manifest)
+    write_json(os.path.join(output_dir, FLEET_FILE), fleet_report)
+    return fleet_report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Process a directory of BMW CarData exports into per-vehicle and fleet-wide statistics.')
+    parser.add_argument('input_dir', help='Directory scanned recursively for CarData JSON exports')
+    parser.add_argument('output_dir', help='Directory for the manifest, per-vehicle reports and fleet.json')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--sessions-format', choices=['parquet', 'arrow'], help='Also store the normalized sessions of every vehicle in this format')
+    parser.add_argument('--models', help='JSON file mapping vehicle ids (export path without extension) to model names')
+    args = parser.parse_args(argv)
+
+    models = None
+    if args.models:
+        with open(args.models, 'r') as f:
+            models = jsonio.load(f)
+    fleet_report = run_batch(args.input_dir, args.output_dir, args.workers, args.sessions_format, models)
+    print(f"Fleet report for {fleet_report['vehicles']} vehicles written to {os.path.join(args.output_dir, FLEET_FILE)}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
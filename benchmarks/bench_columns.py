@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import generate_export
+from bmwtools.sessions import process_data, is_dc_session
+from bmwtools.columns import SessionColumns
+
+# Questions asked of the same sessions, e.g. by the callbacks of one date range after another
+CALLS = 20
+
+def per_call(sessions):
+    """What every caller did before: derive charge type, failures and efficiency again from the session dicts."""
+    for _ in range(CALLS):
+        dc = [is_dc_session(s) for s in sessions]
+        failed = [s['soc_end'] == s['soc_start'] for s in sessions]
+        efficiency = [s['energy_added_hvb'] / s['energy_from_grid'] if s['energy_from_grid'] else 0 for s in sessions]
+    return dc, failed, efficiency
+
+def cached(sessions):
+    columns = SessionColumns(sessions)
+    for _ in range(CALLS):
+        dc, failed, efficiency = columns['is_dc'], columns['failed'], columns['efficiency']
+    return dc, failed, efficiency
+
+def main():
+    print(f"{'sessions':>8} {'columns':<10} {'ms':>8}")
+    for count in (1000, 10000):
+        sessions, _ = process_data(generate_export(count))
+        expected = None
+        for name, run in (('per call', per_call), ('cached', cached)):
+            start = time.perf_counter()
+            result = run(sessions)
+            seconds = time.perf_counter() - start
+            expected = expected or result
+            assert result == expected
+            print(f"{count:>8} {name:<10} {seconds * 1000:>8.1f}")
+
+if __name__ == '__main__':
+    main()
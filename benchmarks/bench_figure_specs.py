@@ -0,0 +1,68 @@
+import os
+import sys
+import timeit
+import plotly.graph_objs as go
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import generate_export
+from figure_specs import figure, scatter, indicator
+from bmwtools.sessions import process_data
+
+GAUGES = 12  # Gauge figures built by upload_json
+
+def gauge_kwargs(i):
+    return dict(
+        mode="gauge+number",
+        value=i * 10.5,
+        title={'text': f"Gauge {i}", 'font': {'size': 14}},
+        domain={'x': [0, 1], 'y': [0, 1]},
+        gauge={'axis': {'range': [0, 200]}, 'bar': {'color': 'blue'}}
+    )
+
+def gauges_graph_objects():
+    figures = []
+    for i in range(GAUGES):
+        fig = go.Figure()
+        fig.add_trace(go.Indicator(**gauge_kwargs(i)))
+        fig.update_layout(height=300, width=300, template='plotly_white')
+        figures.append(fig)
+    return figures
+
+def gauges_specs():
+    return [figure([indicator(**gauge_kwargs(i))], height=300, width=300, template_name='plotly_white') for i in range(GAUGES)]
+
+def overview_graph_objects(sessions):
+    fig = go.Figure()
+    for s in sessions:
+        fig.add_trace(go.Scatter(x=[s['start_time']], y=[s['energy_added_hvb']], mode='markers', marker=dict(size=10, color='blue'), name=s['location']))
+    fig.update_layout(showlegend=True, title='Energy added per charging session', yaxis_title='kWh', xaxis_title='Date')
+    return [fig]
+
+def overview_specs(sessions):
+    return [figure(
+        [scatter(x=[s['start_time']], y=[s['energy_added_hvb']], mode='markers', marker=dict(size=10, color='blue'), name=s['location']) for s in sessions],
+        showlegend=True, title='Energy added per charging session', yaxis_title='kWh', xaxis_title='Date'
+    )]
+
+def measure(build, runs):
+    build_ms = timeit.timeit(build, number=runs) / runs * 1000
+    figures = build()
+    # Dash serializes callback outputs with plotly's JSON encoder
+    serialize_ms = timeit.timeit(lambda: [to_json_plotly(fig) for fig in figures], number=runs) / runs * 1000
+    return build_ms, serialize_ms
+
+def main():
+    sessions, _ = process_data(generate_export(1000))
+    cases = [
+        (f'{GAUGES} gauges', gauges_graph_objects, gauges_specs, 20),
+        ('overview 1000 traces', lambda: overview_graph_objects(sessions), lambda: overview_specs(sessions), 3),
+    ]
+    print(f"{'figures':<22} {'builder':<14} {'build ms':>10} {'serialize ms':>13}")
+    for name, graph_objects, specs, runs in cases:
+        for builder, build in (('go.Figure', graph_objects), ('figure_specs', specs)):
+            build_ms, serialize_ms = measure(build, runs)
+            print(f"{name:<22} {builder:<14} {build_ms:>10.2f} {serialize_ms:>13.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import generate_export
+from bmwtools import jsonio
+from analytics import analyze_data, analyze_archive, build_report
+
+METRICS = ['energy', 'overall']
+
+def load_all(path):
+    """What analytics.py does with an export: load it completely, then analyze it."""
+    with open(path, 'r') as f:
+        return analyze_data([json.loads(line) for line in f], METRICS)
+
+def stream(path, chunk_sessions):
+    with open(path, 'r') as f:
+        return analyze_archive(f, METRICS, chunk_sessions=chunk_sessions)
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    report = build_report(run())
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return report, seconds, peak
+
+def main():
+    print(f"{'sessions':>8} {'ingestion':<20} {'sessions/s':>11} {'peak MiB':>9}")
+    for count in (10000, 40000):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as f:
+            for session in generate_export(count):
+                f.write(jsonio.dumps(session) + '\n')
+        try:
+            expected = None
+            for name, run in (
+                ('load all', lambda: load_all(f.name)),
+                ('chunks of 1000', lambda: stream(f.name, 1000)),
+                ('chunks of 5000', lambda: stream(f.name, 5000)),
+            ):
+                report, seconds, peak = measure(run)
+                expected = expected or report
+                assert report == expected
+                print(f"{count:>8} {name:<20} {count / seconds:>11.0f} {peak / 2**20:>9.1f}")
+        finally:
+            os.unlink(f.name)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import json
+import os
+import sys
+import timeit
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import generate_export
+from bmwtools import jsonio
+from bmwtools.sessions import process_data
+from callbacks import build_dataset_figures
+
+def main():
+    engines = ['json'] + (['orjson'] if jsonio.orjson is not None else [])
+    print(f"JSON backend in use: {jsonio.BACKEND}")
+    print(f"{'sessions':>8} {'task':<22} {'engine':<8} {'bytes':>10} {'ms':>10}")
+    for count in (1000, 10000):
+        upload = json.dumps(generate_export(count)).encode()
+        parsers = {'json': json.loads, 'orjson': lambda data: jsonio.orjson.loads(data)}
+        for engine in engines:
+            runs = 5
+            ms = timeit.timeit(lambda: parsers[engine](upload), number=runs) / runs * 1000
+            print(f"{count:>8} {'parse upload':<22} {engine:<8} {len(upload):>10} {ms:>10.2f}")
+
+        sessions, _ = process_data(json.loads(upload))
+        # Figures as update_dataset_figures sends them, serialized like Dash does
+        figures = list(build_dataset_figures(sessions)[:3])
+        for engine in engines:
+            runs = 5
+            payload = to_json_plotly(figures, engine=engine)
+            ms = timeit.timeit(lambda: to_json_plotly(figures, engine=engine), number=runs) / runs * 1000
+            print(f"{count:>8} {'serialize figures':<22} {engine:<8} {len(payload):>10} {ms:>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import os
+import sys
+import zlib
+import brotli
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import generate_export
+from bmwtools.sessions import process_data
+from charging_curves import ChargingCurveCube
+from callbacks import create_gauge_figure, create_charging_curves_plot, build_dataset_figures
+from payload import optimize_figure
+from utils import create_gauge_trace
+
+def sizes(value):
+    payload = to_json_plotly(value).encode()
+    return len(payload), len(zlib.compress(payload)), len(brotli.compress(payload))
+
+def main():
+    print(f"{'sessions':>8} {'figure':<10} {'payload':<10} {'bytes':>10} {'gzip':>8} {'brotli':>8}")
+    for count in (100, 1000):
+        data = generate_export(count)
+        sessions, _ = process_data(data)
+        overview, _, soh, _ = build_dataset_figures(sessions)
+        figures = [
+            ('gauge', create_gauge_figure([create_gauge_trace(42.0, 'Gauge', 'blue', [0, 1], range_max=100)])),
+            ('overview', overview),
+            ('curves', create_charging_curves_plot(ChargingCurveCube.from_data(data), 0, count)),
+            ('soh', soh),
+        ]
+        for name, spec in figures:
+            for stage, value in (('spec', spec), ('optimized', optimize_figure(spec))):
+                raw, gzipped, brotlied = sizes(value)
+                print(f"{count:>8} {name:<10} {stage:<10} {raw:>10} {gzipped:>8} {brotlied:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import generate_export
+from bmwtools.sessions import process_data
+from bmwtools.providers import ProviderStats
+from bmwtools.provider_cube import ProviderCube
+
+QUERIES = [
+    ('providers', ('provider',), {}),
+    ('DC failures per provider', ('provider',), {'charge_type': 'DC', 'success': False}),
+    ('months of a provider', ('month',), {'provider': None}),
+    ('provider, DC, failed', (), {'provider': None, 'charge_type': 'DC', 'success': False}),
+]
+
+def count_providers(sessions):
+    stats = ProviderStats()
+    for session in sessions:
+        stats.add(session)
+    stats.top_failed_providers()  # Providers are normalized when the result is read
+    return stats
+
+def timed(run, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = run()
+    return result, (time.perf_counter() - start) / repeat
+
+def main():
+    print(f"{'sessions':>8} {'query':<28} {'scan µs':>10} {'cube µs':>10}")
+    for count in (1000, 10000):
+        sessions, _ = process_data(generate_export(count))
+        cube = ProviderCube().add_sessions(sessions)
+        provider = max(cube.query(('provider',)).items(), key=lambda item: item[1]['sessions'])[0][0]
+
+        # What the dashboard does without the cube: count the sessions again for every question
+        stats, seconds = timed(lambda: count_providers(sessions), 3)
+        totals = cube.query(('provider', 'success'))
+        failed_counts = stats.providers.canonical_counts(stats.failed_providers_count)
+        successful_counts = stats.providers.canonical_counts(stats.successful_providers_count)
+        assert all(totals[(name, False)]['sessions'] == failed for name, failed in failed_counts.items())
+        assert all(totals[(name, True)]['sessions'] == successful for name, successful in successful_counts.items())
+
+        for name, group_by, filters in QUERIES:
+            filters = {dimension: provider if value is None else value for dimension, value in filters.items()}
+            _, cube_seconds = timed(lambda: cube.query(group_by, **filters), 1000)
+            print(f"{count:>8} {name:<28} {seconds * 1e6:>10.0f} {cube_seconds * 1e6:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import os
+import sys
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import generate_export
+from bmwtools.sessions import process_data, is_dc_session, calculate_overall_stats, calculate_soc_statistics
+from bmwtools.summary import summarize_sessions
+from aggregate_index import AggregateIndex
+
+def fan_out(sessions):
+    """The scalar statistics as upload_json computed them before: one scan per closure in a thread pool."""
+    def calculate_total_energy():
+        total_energy_dc = sum(s['energy_added_hvb'] for s in sessions if is_dc_session(s))
+        total_energy_ac = sum(s['energy_added_hvb'] for s in sessions if not is_dc_session(s))
+        return total_energy_dc, total_energy_ac
+
+    def calculate_current_km():
+        return max(s['mileage'] for s in sessions) - min(s['mileage'] for s in sessions)
+
+    def calculate_session_counts():
+        failed = sum(1 for s in sessions if s['soc_end'] == s['soc_start'])
+        return len(sessions), failed, len(sessions) - failed
+
+    with ThreadPoolExecutor() as executor:
+        futures = [executor.submit(f) for f in (
+            calculate_total_energy,
+            calculate_current_km,
+            calculate_session_counts,
+            lambda: calculate_overall_stats(sessions),
+            lambda: calculate_soc_statistics(sessions)
+        )]
+        return [future.result() for future in futures]
+
+def main():
+    print(f"{'sessions':>8} {'method':<26} {'ms':>10}")
+    for count in (1000, 10000, 50000):
+        sessions, _ = process_data(generate_export(count))
+        index = AggregateIndex(sessions)
+        runs = 20
+        for name, run in (
+            ('thread pool fan-out', lambda: fan_out(sessions)),
+            ('summarize_sessions', lambda: summarize_sessions(sessions)),
+            ('AggregateIndex.summary', lambda: index.summary(0, len(index))),
+        ):
+            ms = timeit.timeit(run, number=runs) / runs * 1000
+            print(f"{count:>8} {name:<26} {ms:>10.3f}")
+
+if __name__ == '__main__':
+    main()
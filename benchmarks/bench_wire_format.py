@@ -0,0 +1,37 @@
+import datetime
+import json
+import os
+import sys
+import timeit
+import plotly
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import generate_export
+from bmwtools.sessions import process_data
+from wire_format import encode_sessions, decode_sessions
+
+def decode_legacy(payload):
+    """What update_dashboard did with the session-data store before the wire format."""
+    sessions = json.loads(payload)
+    for session in sessions:
+        session['start_time'] = datetime.datetime.fromisoformat(session['start_time'])
+        session['end_time'] = datetime.datetime.fromisoformat(session['end_time'])
+    return sessions
+
+def main():
+    print(f"{'sessions':>8} {'format':<18} {'bytes':>10} {'ratio':>6} {'decode ms':>10}")
+    for count in (100, 1000, 5000):
+        sessions, _ = process_data(generate_export(count))
+        legacy = json.dumps(sessions, cls=plotly.utils.PlotlyJSONEncoder)
+        results = [('legacy', legacy, lambda: decode_legacy(legacy))]
+        for compress in (False, True):
+            payload = json.dumps(encode_sessions(sessions, compress=compress), separators=(',', ':'))
+            results.append(('compact+zlib' if compress else 'compact', payload, lambda payload=payload: decode_sessions(json.loads(payload))))
+
+        for name, payload, decode in results:
+            runs = 5
+            decode_ms = timeit.timeit(decode, number=runs) / runs * 1000
+            print(f"{count:>8} {name:<18} {len(payload):>10} {len(payload) / len(legacy):>6.2f} {decode_ms:>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import random
+
+PROVIDERS = ['IONITY GmbH', 'HPC IONITY', 'EnBW mobility+', 'HPC/DC/AC EnBW mobility+', 'Tesla', 'Allego', 'Fastned', 'Shell Recharge']
+PLACES = [
+    ('Marienplatz 1, 80331 München', 48.137, 11.575),
+    ('Alexanderplatz 1, 10178 Berlin', 52.521, 13.413),
+    ('Jungfernstieg 1, 20095 Hamburg', 53.553, 9.993),
+    ('Rastanlage Holledau, 85283 Wolnzach', 48.592, 11.608),
+    ('Autohof Ulm, 89081 Ulm', 48.420, 9.946),
+]
+
+def generate_export(sessions=1000, seed=0, start_time=1600000000):
+    """Generate a synthetic CarData export (BMW-CarData-Ladehistorie_*.json content) for benchmarks."""
+    rng = random.Random(seed)
+    export = []
+    mileage = 1000
+    for _ in range(sessions):
+        start_time += rng.randint(3600, 4 * 86400)
+        is_dc = rng.random() < 0.4
+        blocks = []
+        block_time = start_time
+        for _ in range(rng.randint(5, 80)):
+            power = rng.uniform(50, 200) if is_dc else rng.choice([3.7, 7.4, 11.0])
+            blocks.append({'averagePowerGridKw': round(power, 2), 'startTime': block_time, 'endTime': block_time + 60})
+            block_time += 60
+
+        soc_start = rng.randint(5, 60)
+        failed = rng.random() < 0.1
+        soc_end = soc_start if failed else rng.randint(soc_start + 1, 100)
+        energy = 0 if failed else round(sum(block['averagePowerGridKw'] for block in blocks) / 60, 2)
+        address, latitude, longitude = rng.choice(PLACES)
+        mileage += rng.randint(0, 500)
+
+        session = {
+            'startTime': start_time,
+            'endTime': block_time,
+            'displayedStartSoc': soc_start,
+            'displayedSoc': soc_end,
+            'energyConsumedFromPowerGridKwh': energy,
+            'chargingBlocks': blocks,
+            'mileage': mileage,
+            'mileageUnits': 'KM',
+            'isPreconditioningActivated': rng.random() < 0.3,
+            'chargingCostInformation': {'calculatedChargingCost': round(energy * 0.49, 2), 'currency': 'EUR'},
+            'chargingLocation': {
+                'formattedAddress': address,
+                'mapMatchedLatitude': round(latitude + rng.uniform(-0.0003, 0.0003), 6),
+                'mapMatchedLongitude': round(longitude + rng.uniform(-0.0003, 0.0003), 6),
+            },
+        }
+        if rng.random() < 0.8:
+            session['energyIncreaseHvbKwh'] = round(energy * rng.uniform(0.85, 0.97), 2)
+        if rng.random() < 0.7:
+            session['publicChargingPoint'] = {'potentialChargingPointMatches': [{'providerName': rng.choice(PROVIDERS)}]}
+        export.append(session)
+    return export
@@ -0,0 +1,47 @@
+"""Headless core of BMW Tools: ingestion and analytics of CarData charging sessions.
+
+Importing the package does not import any visualization library (plotly,
+folium, geopy, pandas) nor the fuzzy matcher, so batch jobs and workers
+start fast. The Dash app and the scripts in the repository root are built
+on top of it.
+"""
+from bmwtools.sessions import (
+    DC_POWER_THRESHOLD_KW,
+    is_dc_session,
+    process_session,
+    iter_sessions_with_blocks,
+    iter_sessions,
+    process_data,
+    calculate_estimated_battery_capacity,
+    calculate_overall_stats,
+    calculate_soc_statistics
+)
+from bmwtools.summary import SessionSummary, summarize_sessions
+from bmwtools.providers import (
+    ProviderNormalizer,
+    ProviderStats,
+    get_session_stats
+)
+from bmwtools.provider_cube import ProviderCube
+from bmwtools.columns import COLUMNS, register_column, SessionColumns
+
+__all__ = [
+    'DC_POWER_THRESHOLD_KW',
+    'is_dc_session',
+    'process_session',
+    'iter_sessions_with_blocks',
+    'iter_sessions',
+    'process_data',
+    'calculate_estimated_battery_capacity',
+    'calculate_overall_stats',
+    'calculate_soc_statistics',
+    'SessionSummary',
+    'summarize_sessions',
+    'ProviderNormalizer',
+    'ProviderStats',
+    'get_session_stats',
+    'ProviderCube',
+    'COLUMNS',
+    'register_column',
+    'SessionColumns',
+]
@@ -0,0 +1,133 @@
+"""Derived columns of normalized sessions, each defined once and computed lazily over a whole dataset."""
+from bmwtools.sessions import DC_POWER_THRESHOLD_KW
+
+# Registry of derived columns by name, filled by @register_column
+COLUMNS = {}
+
+def register_column(name, depends):
+    """Register a function computing the column name from the columns or session fields in depends.
+
+    The function receives one list per dependency, in the order of depends,
+    and returns a list with one value per session. Dependencies are only
+    passed in, never read from the sessions, so every column is recomputed
+    when one of them changes.
+    """
+    def decorator(func):
+        func.column = name
+        func.depends = tuple(depends)
+        COLUMNS[name] = func
+        return func
+    return decorator
+
+@register_column('avg_power', ('grid_power_start',))
+def avg_power(grid_power_start):
+    return [sum(power) / max(len(power), 1) for power in grid_power_start]
+
+@register_column('max_power', ('grid_power_start',))
+def max_power(grid_power_start):
+    return [max(power, default=0) for power in grid_power_start]
+
+@register_column('min_power', ('grid_power_start',))
+def min_power(grid_power_start):
+    return [min(power, default=0) for power in grid_power_start]
+
+@register_column('is_dc', ('avg_power',))
+def is_dc(avg_power):
+    return [power >= DC_POWER_THRESHOLD_KW for power in avg_power]
+
+@register_column('charge_type', ('is_dc',))
+def charge_type(is_dc):
+    return ['DC' if dc else 'AC' for dc in is_dc]
+
+@register_column('soc_change', ('soc_start', 'soc_end'))
+def soc_change(soc_start, soc_end):
+    return [end - start for start, end in zip(soc_start, soc_end)]
+
+@register_column('failed', ('soc_change',))
+def failed(soc_change):
+    return [change == 0 for change in soc_change]
+
+@register_column('efficiency', ('energy_added_hvb', 'energy_from_grid'))
+def efficiency(energy_added_hvb, energy_from_grid):
+    return [added / grid if grid else 0 for added, grid in zip(energy_added_hvb, energy_from_grid)]
+
+@register_column('energy_wasted', ('energy_added_hvb', 'energy_from_grid'))
+def energy_wasted(energy_added_hvb, energy_from_grid):
+    return [grid - added for added, grid in zip(energy_added_hvb, energy_from_grid)]
+
+@register_column('energy_wasted_percent', ('energy_wasted', 'energy_from_grid'))
+def energy_wasted_percent(energy_wasted, energy_from_grid):
+    return [wasted / grid * 100 if grid > 0 else 0 for wasted, grid in zip(energy_wasted, energy_from_grid)]
+
+def dependents(name):
+    """Names of the columns computed from name, directly or through other columns."""
+    found = set()
+    pending = [name]
+    while pending:
+        current = pending.pop()
+        for column, func in COLUMNS.items():
+            if current in func.depends and column not in found:
+                found.add(column)
+                pending.append(column)
+    return found
+
+class SessionColumns:
+    """Columns of a list of normalized sessions, computed on first access and cached.
+
+    A registered column (see COLUMNS) is computed over all sessions at once
+    from its dependencies, any other name is the vector of that session
+    field. slice() gives the columns of a copy of a range of the sessions,
+    starting with slices of the columns cached so far. Kept with a dataset
+    (AggregateIndex.columns), the dashboard and the scripts share the same
+    vectors. Concurrent first accesses may compute a column twice, with the
+    same result.
+    """
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.cache = {}
+
+    def __getitem__(self, name):
+        column = self.cache.get(name)
+        if column is None:
+            func = COLUMNS.get(name)
+            if func is not None:
+                column = func(*(self[dependency] for dependency in func.depends))
+            elif self.sessions and name not in self.sessions[0]:
+                raise KeyError(f"Unknown column {name}")
+            else:
+                column = [session[name] for session in self.sessions]
+            self.cache[name] = column
+        return column
+
+    def slice(self, lo, hi):
+        """Columns of copies of the sessions in [lo, hi), so set_field on them leaves these columns valid."""
+        columns = SessionColumns([dict(session) for session in self.sessions[lo:hi]])
+        columns.cache = {name: column[lo:hi] for name, column in self.cache.items()}
+        return columns
+
+    def invalidate(self, name):
+        """Drop the cached column name and every cached column computed from it."""
+        for column in (name, *dependents(name)):
+            self.cache.pop(column, None)
+
+    def set_field(self, name, values):
+        """Replace a field of every session, recomputing the columns depending on it on their next access.
+
+        Registered columns are derived, not set. Those that are also fields
+        of the sessions (avg_power, efficiency) are recomputed right away and
+        written back, so the sessions stay consistent with the new field.
+        Structures built from the columns, like the prefix sums of an
+        AggregateIndex, are not updated and have to be rebuilt.
+        """
+        if name in COLUMNS:
+            raise ValueError(f"{name} is a derived column, set the fields it is computed from instead")
+        if len(values) != len(self.sessions):
+            raise ValueError(f"Expected {len(self.sessions)} values for {name}, got {len(values)}")
+        for session, value in zip(self.sessions, values):
+            session[name] = value
+        self.invalidate(name)
+        for column in dependents(name):
+            if self.sessions and column in self.sessions[0]:
+                for session, value in zip(self.sessions, self[column]):
+                    session[column] = value
@@ -0,0 +1,96 @@
+"""Chunked ingestion of CarData archives too large to load at once.
+
+An archive is a text file with raw sessions as NDJSON (one session object per
+line), as one or more concatenated JSON arrays, or a mix of both, optionally
+gzip compressed. It is read READ_SIZE characters at a time and handed on in
+chunks of raw sessions, so memory stays bounded by the chunk size however
+large the archive is.
+"""
+import gzip
+import hashlib
+import json
+from bmwtools.sessions import process_data
+
+# Characters read from an archive at a time
+READ_SIZE = 1 << 20
+
+# Raw sessions per chunk
+CHUNK_SESSIONS = 1000
+
+# File extensions of archives read as a stream by default
+ARCHIVE_EXTENSIONS = ('.ndjson', '.jsonl', '.ndjson.gz', '.jsonl.gz', '.json.gz')
+
+_WHITESPACE = ' \t\r\n'
+
+def open_archive(path):
+    """Open an archive as text, decompressing it on the fly if the path ends with .gz."""
+    if path.lower().endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+def iter_raw_sessions(file, read_size=READ_SIZE):
+    """Yield the raw sessions of an archive opened in text mode, one at a time."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    in_array = False
+    eof = False
+    while True:
+        # Skip whitespace and, inside a top level array, the commas between sessions
+        while position < len(buffer) and (buffer[position] in _WHITESPACE or (in_array and buffer[position] == ',')):
+            position += 1
+        if position == len(buffer):
+            if eof:
+                break
+            buffer, position = file.read(read_size), 0
+            eof = not buffer
+            continue
+
+        char = buffer[position]
+        if char == '[' and not in_array:
+            in_array = True
+            position += 1
+            continue
+        if char == ']' and in_array:
+            in_array = False
+            position += 1
+            continue
+
+        try:
+            value, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The session continues in the next read, keep only its beginning
+            more = file.read(read_size)
+            eof = not more
+            buffer, position = buffer[position:] + more, 0
+            continue
+        if isinstance(value, list):
+            yield from value
+        else:
+            yield value
+
+    if in_array:
+        raise json.JSONDecodeError("Unterminated array", buffer, position)
+
+def iter_session_chunks(file, chunk_sessions=CHUNK_SESSIONS, read_size=READ_SIZE):
+    """Yield the raw sessions of an archive in lists of at most chunk_sessions."""
+    chunk = []
+    for session in iter_raw_sessions(file, read_size):
+        chunk.append(session)
+        if len(chunk) == chunk_sessions:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_processed_chunks(file, chunk_sessions=CHUNK_SESSIONS, read_size=READ_SIZE):
+    """Yield (sessions, using_estimated_values) of process_data for every chunk of an archive."""
+    for chunk in iter_session_chunks(file, chunk_sessions, read_size):
+        yield process_data(chunk)
+
+def session_key(session):
+    """Identity of a normalized session, the same for the session in every export or archive containing it."""
+    identity = f"{session['start_time'].isoformat()}|{session['end_time'].isoformat()}|{session['mileage']}|{session['latitude']}|{session['longitude']}"
+    return hashlib.sha256(identity.encode()).hexdigest()[:32]
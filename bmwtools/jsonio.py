@@ -0,0 +1,51 @@
+"""JSON parsing and serialization with orjson when it is installed, the standard library json module otherwise.
+
+Set BMWTOOLS_JSON_BACKEND=json to use the standard library even when orjson
+is installed. Input orjson rejects but json accepts (NaN literals, integers
+above 64 bit) falls back to json, so both backends parse the same documents.
+Serializing differs: orjson writes datetimes as ISO 8601 strings and NaN as
+null, json raises TypeError on datetimes and writes NaN literals; values
+orjson cannot serialize fall back to json.
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Name of the backend in use, also a valid plotly.io.json.config.default_engine
+BACKEND = os.environ.get('BMWTOOLS_JSON_BACKEND', 'orjson' if orjson is not None else 'json')
+if BACKEND not in ('orjson', 'json'):
+    raise ValueError(f"Unknown JSON backend {BACKEND!r}, expected 'orjson' or 'json'")
+if BACKEND == 'orjson' and orjson is None:
+    raise ImportError("BMWTOOLS_JSON_BACKEND=orjson requires the orjson package")
+
+def loads(data):
+    """Parse a JSON document from str, bytes or bytearray."""
+    if BACKEND == 'orjson':
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+def load(file):
+    """Parse the JSON document of a file opened in text or binary mode."""
+    return loads(file.read())
+
+def dumps(value, indent=None):
+    """Serialize value as compact JSON string, or indented by 2 spaces with indent=2."""
+    if BACKEND == 'orjson' and indent in (None, 2):
+        try:
+            return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+        except TypeError:
+            pass
+    if indent:
+        return json.dumps(value, indent=indent)
+    return json.dumps(value, separators=(',', ':'))
+
+def dump(value, file, indent=None):
+    """Serialize value as JSON into a file opened in text mode."""
+    file.write(dumps(value, indent=indent))
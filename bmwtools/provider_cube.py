@@ -0,0 +1,161 @@
+"""Provider x month x charge type x success cube of session counts and energy, cost and duration sums."""
+from itertools import combinations
+from bmwtools.sessions import is_dc_session
+from bmwtools.providers import ProviderNames
+
+# Dimensions of the cube, in the order of the cell keys
+DIMENSIONS = ('provider', 'month', 'charge_type', 'success')
+
+# Measures summed per cell, in the order of the cell values
+MEASURES = ('sessions', 'energy_added', 'energy_from_grid', 'cost', 'duration_minutes')
+
+# Every subset of dimensions (as sorted dimension positions), the base cuboid has all of them
+_CUBOIDS = [dims for size in range(len(DIMENSIONS) + 1) for dims in combinations(range(len(DIMENSIONS)), size)]
+
+_VALUE_SETS = (set, frozenset, list, tuple)
+
+# Function to add the measures of a base cell to the cells of every cuboid it rolls up into
+def _roll_up(cuboids, members, key, values):
+    for dims, cells in cuboids.items():
+        cell_key = tuple(key[i] for i in dims)
+        cell = cells.get(cell_key)
+        if cell is None:
+            cells[cell_key] = list(values)
+            for dimension_members, value in zip(members[dims], cell_key):
+                dimension_members.setdefault(value, []).append(cell_key)
+        else:
+            for i, value in enumerate(values):
+                cell[i] += value
+
+class ProviderCube:
+    """Sums of the measures per canonical provider, month ('YYYY-MM'), charge type ('AC' / 'DC') and success.
+
+    Sessions are summed into base cells by raw provider name. Like
+    ProviderStats, cubes built per chunk or worker are combined
+    associatively with merge() and moved between processes with state() /
+    from_state(), and providers are only mapped to canonical names (see
+    ProviderNames) when the cube is queried. The first query then builds the
+    roll-up over every subset of dimensions, so a query only reads the
+    smallest cuboid holding its dimensions and a point lookup is a single
+    dict access. The cells of every cuboid are also indexed by the value of
+    each of its dimensions, so a filtered query only visits matching cells.
+    """
+
+    def __init__(self, normalizer=None):
+        self.providers = ProviderNames(normalizer)
+        self.cells = {}  # Base cells by raw provider name
+        self.cuboids = None  # Roll-ups by canonical provider name, built on the first query
+        self.members = None  # Keys of the cells of every cuboid per position in the key and value at that position
+
+    def cell_key(self, session):
+        """Base cell of a normalized session, failed (success False) when its SoC did not change."""
+        return (
+            session['provider'],
+            session['start_time'].strftime('%Y-%m'),
+            'DC' if is_dc_session(session) else 'AC',
+            session['soc_end'] != session['soc_start']
+        )
+
+    def _add_cell(self, key, values):
+        self.providers.add(key[0])
+        cell = self.cells.get(key)
+        if cell is None:
+            self.cells[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                cell[i] += value
+        self.cuboids = self.members = None
+
+    def _build_cuboids(self):
+        # Built aside and then published, so concurrent queries of a cached cube never see a partial roll-up
+        cuboids = {dims: {} for dims in _CUBOIDS}
+        members = {dims: [{} for _ in dims] for dims in _CUBOIDS}
+        for key, values in self.cells.items():
+            _roll_up(cuboids, members, (self.providers.canonical(key[0]),) + key[1:], values)
+        self.members = members
+        self.cuboids = cuboids
+
+    def add(self, session):
+        self._add_cell(self.cell_key(session), (
+            1,
+            session['energy_added_hvb'],
+            session['energy_from_grid'],
+            session['cost'],
+            session['session_time_minutes']
+        ))
+
+    def add_sessions(self, sessions):
+        for session in sessions:
+            self.add(session)
+        return self
+
+    def merge(self, other):
+        self.providers.merge(other.providers)
+        for key, values in other.cells.items():
+            self._add_cell(key, values)
+        return self
+
+    def query(self, group_by=(), **filters):
+        """Measures of the sessions matching filters, per value combination of the group_by dimensions.
+
+        filters map dimensions to a value or a set, list or tuple of values,
+        e.g. query(('provider',), charge_type='DC', success=False). Returns
+        {group: {measure: sum}} with groups as tuples in the order of
+        group_by, () without group_by.
+        """
+        unknown = [dimension for dimension in (*group_by, *filters) if dimension not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {', '.join(unknown)}")
+        dims = tuple(sorted({DIMENSIONS.index(dimension) for dimension in (*group_by, *filters)}))
+        if self.cuboids is None:
+            self._build_cuboids()
+        cells = self.cuboids[dims]
+
+        # Every dimension filtered with a single value: a single cell
+        if not group_by and not any(isinstance(value, _VALUE_SETS) for value in filters.values()):
+            cell = cells.get(tuple(filters[DIMENSIONS[i]] for i in dims))
+            return {(): dict(zip(MEASURES, cell))} if cell else {}
+
+        group_positions = [dims.index(DIMENSIONS.index(dimension)) for dimension in group_by]
+        filter_positions = [
+            (dims.index(DIMENSIONS.index(dimension)), set(value) if isinstance(value, _VALUE_SETS) else {value})
+            for dimension, value in filters.items()
+        ]
+        keys = cells
+        if filter_positions:
+            # Only the cells having one of the values of the most selective filter
+            members = self.members[dims]
+            keys = min(
+                ([key for value in allowed for key in members[position].get(value, ())] for position, allowed in filter_positions),
+                key=len
+            )
+        groups = {}
+        for key in keys:
+            if any(key[position] not in allowed for position, allowed in filter_positions):
+                continue
+            values = cells[key]
+            group = tuple(key[position] for position in group_positions)
+            sums = groups.get(group)
+            if sums is None:
+                groups[group] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    sums[i] += value
+        return {group: dict(zip(MEASURES, sums)) for group, sums in groups.items()}
+
+    def rows(self, group_by=DIMENSIONS, **filters):
+        """Result of query() as a list of dicts with the group_by dimensions and the measures, sorted by group."""
+        return [
+            dict(zip(group_by, group), **measures)
+            for group, measures in sorted(self.query(group_by, **filters).items(), key=lambda item: [str(value) for value in item[0]])
+        ]
+
+    def state(self):
+        return {'cells': [[*key, *values] for key, values in self.cells.items()]}
+
+    @classmethod
+    def from_state(cls, state, normalizer=None):
+        cube = cls(normalizer)
+        for cell in state['cells']:
+            cube._add_cell(tuple(cell[:len(DIMENSIONS)]), cell[len(DIMENSIONS):])
+        return cube
@@ -0,0 +1,239 @@
+"""Canonical provider names and failed / successful session counts per provider."""
+import heapq
+import threading
+from collections import Counter
+import re
+import datetime
+
+# Number of providers in the top failed / successful provider lists
+TOP_PROVIDERS = 5
+
+# Minimum fuzzy matching score for a provider name to be merged into a known provider
+PROVIDER_MATCH_THRESHOLD = 90
+
+# Function to clean provider names by removing extraneous terms like "HPC", "DC", "GmbH", etc.
+def preprocess_provider_name(provider_name):
+    # Remove terms like "HPC", "DC", "AC", "GmbH" etc. for better matching
+    cleaned_name = re.sub(r'\b(HPC|DC|AC|GmbH)\b', '', provider_name, flags=re.IGNORECASE)
+    # Strip extra spaces that might occur after removing words
+    cleaned_name = re.sub(r'\s+', ' ', cleaned_name).strip()
+    return cleaned_name.lower()
+
+class ProviderNormalizer:
+    """Maps raw provider names to canonical names with fuzzy matching (after cleaning).
+
+    Names are matched against the providers seen so far by this normalizer,
+    and the canonical name of every distinct raw string is cached, so the
+    fuzzy matcher runs once per distinct string. Normalizing is thread safe.
+    """
+
+    def __init__(self, threshold=PROVIDER_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.known_providers = []  # Processed (simplified) provider names for fuzzy matching
+        self.original_provider_names = {}  # Original form of every processed name
+        self.canonical_names = {}  # Canonical name per raw provider name
+        self._lock = threading.Lock()
+
+    def _match(self, provider_name):
+        # Clean the provider name for matching purposes
+        provider_name_cleaned = preprocess_provider_name(provider_name)
+
+        # If there are known providers already, try to match using fuzzy matching
+        if self.known_providers:
+            from fuzzywuzzy import process  # Imported on first match, so importing the package stays cheap
+            best_match_cleaned, confidence = process.extractOne(provider_name_cleaned, self.known_providers)
+            # If the confidence is high enough, return the original version of the matched provider name
+            if confidence > self.threshold:
+                return self.original_provider_names[best_match_cleaned]
+
+        # If no match or confidence is low, consider this a new provider
+        self.known_providers.append(provider_name_cleaned)
+        self.original_provider_names[provider_name_cleaned] = provider_name
+        return provider_name
+
+    def __getstate__(self):
+        state = dict(vars(self))
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        vars(self).update(state)
+        self._lock = threading.Lock()
+
+    def normalize(self, provider_name):
+        canonical = self.canonical_names.get(provider_name)
+        if canonical is None:
+            with self._lock:
+                canonical = self.canonical_names.get(provider_name)
+                if canonical is None:
+                    canonical = self.canonical_names[provider_name] = self._match(provider_name)
+        return canonical
+
+    @classmethod
+    def for_names(cls, provider_names, threshold=PROVIDER_MATCH_THRESHOLD):
+        """Normalizer that has seen provider_names in sorted order, whatever order they were collected in."""
+        normalizer = cls(threshold)
+        for provider_name in sorted(provider_names):
+            normalizer.normalize(provider_name)
+        return normalizer
+
+class ProviderNames:
+    """Canonical names of the raw provider names of sessions counted per raw name.
+
+    Counts keyed by the raw provider name add up in any order, so merging
+    them is associative and commutative; names are only normalized when a
+    result is read. With a normalizer (e.g. the one of a dataset) names are
+    normalized by it, without one by a normalizer that sees all names in
+    sorted order, so the canonical names only depend on the set of raw names.
+    Merging names normalized by different normalizers drops the normalizer.
+    """
+
+    def __init__(self, normalizer=None):
+        self.normalizer = normalizer
+        self.names = set()
+        self._canonical = None
+
+    def add(self, provider_name):
+        if provider_name not in self.names:
+            self.names.add(provider_name)
+            self._canonical = None
+
+    def merge(self, other):
+        if other.normalizer is not self.normalizer:
+            self.normalizer = None
+            self._canonical = None
+        if not other.names <= self.names:
+            self.names |= other.names
+            self._canonical = None
+
+    def canonical(self, provider_name):
+        if self._canonical is None:
+            normalizer = self.normalizer or ProviderNormalizer.for_names(self.names)
+            self._canonical = {name: normalizer.normalize(name) for name in self.names}
+        return self._canonical[provider_name]
+
+    def canonical_counts(self, counts):
+        """Counter of counts by raw provider name summed per canonical name, in order of first appearance."""
+        canonical_counts = Counter()
+        for provider, count in counts.items():
+            canonical_counts[self.canonical(provider)] += count
+        return canonical_counts
+
+class ProviderStats:
+    """Failed and successful session counts, in total and per canonical provider.
+
+    Each instance only holds its own counts, so concurrent requests do not
+    share state. Sessions are counted per raw provider name and normalized
+    when the top providers are read (see ProviderNames), so instances built
+    per chunk of sessions, possibly in parallel, combine associatively with
+    merge(). Partial results can be moved between processes with state() /
+    from_state().
+    """
+
+    def __init__(self, normalizer=None):
+        self.providers = ProviderNames(normalizer)
+        self.total_failed_sessions = 0
+        self.total_successful_sessions = 0
+        self.failed_providers_count = Counter()  # Sessions per raw provider name
+        self.successful_providers_count = Counter()
+
+    @property
+    def total_sessions(self):
+        return self.total_failed_sessions + self.total_successful_sessions
+
+    def add_provider_session(self, provider_name, failed):
+        self.providers.add(provider_name)
+        if failed:
+            self.total_failed_sessions += 1
+            self.failed_providers_count[provider_name] += 1
+        else:
+            self.total_successful_sessions += 1
+            self.successful_providers_count[provider_name] += 1
+
+    def add(self, session):
+        """Count a normalized session (see utils.process_session), failed when its SoC did not change."""
+        self.add_provider_session(session['provider'], session['soc_end'] == session['soc_start'])
+
+    def merge(self, other):
+        self.providers.merge(other.providers)
+        self.failed_providers_count.update(other.failed_providers_count)
+        self.successful_providers_count.update(other.successful_providers_count)
+        self.total_failed_sessions += other.total_failed_sessions
+        self.total_successful_sessions += other.total_successful_sessions
+        return self
+
+    def _top(self, counts, n):
+        # Same order as a stable sort by count, without sorting every provider
+        counts = self.providers.canonical_counts(counts)
+        return heapq.nlargest(n, ((provider, count) for provider, count in counts.items() if provider != 'Unknown'), key=lambda item: item[1])
+
+    def top_failed_providers(self, n=TOP_PROVIDERS):
+        return self._top(self.failed_providers_count, n)
+
+    def top_successful_providers(self, n=TOP_PROVIDERS):
+        return self._top(self.successful_providers_count, n)
+
+    def session_stats(self, top_n=TOP_PROVIDERS):
+        return {
+            'total_sessions': self.total_sessions,
+            'total_failed_sessions': self.total_failed_sessions,
+            'total_successful_sessions': self.total_successful_sessions,
+            'top_failed_providers': self.top_failed_providers(top_n),
+            'top_successful_providers': self.top_successful_providers(top_n)
+        }
+
+    def state(self):
+        return {
+            'total_failed_sessions': self.total_failed_sessions,
+            'total_successful_sessions': self.total_successful_sessions,
+            'failed_providers_count': dict(self.failed_providers_count),
+            'successful_providers_count': dict(self.successful_providers_count)
+        }
+
+    @classmethod
+    def from_state(cls, state, normalizer=None):
+        stats = cls(normalizer)
+        stats.total_failed_sessions = state['total_failed_sessions']
+        stats.total_successful_sessions = state['total_successful_sessions']
+        stats.failed_providers_count = Counter(state['failed_providers_count'])
+        stats.successful_providers_count = Counter(state['successful_providers_count'])
+        for provider in (*stats.failed_providers_count, *stats.successful_providers_count):
+            stats.providers.add(provider)
+        return stats
+
+# Function to count failed and successful sessions per provider of raw CarData sessions
+def process_sessions(data, start_date=None, end_date=None, normalizer=None):
+    stats = ProviderStats(normalizer)
+    for session in data:
+        # Convert timestamps to datetime objects
+        session_start_time = datetime.datetime.fromtimestamp(session['startTime'])
+        
+        # Filter by date range if provided
+        if start_date and end_date:
+            if not (start_date <= session_start_time <= end_date):
+                continue
+
+        # Check if 'displayedSoc' and 'displayedStartSoc' exist in the session
+        if 'displayedSoc' in session and 'displayedStartSoc' in session:
+            soc = session['displayedSoc']
+            start_soc = session['displayedStartSoc']
+            
+            # Check if 'publicChargingPoint' and 'providerName' exist
+            if 'publicChargingPoint' in session and 'potentialChargingPointMatches' in session['publicChargingPoint']:
+                # Extract the providerName (assuming first match is relevant)
+                provider_name = session['publicChargingPoint']['potentialChargingPointMatches'][0].get('providerName', 'Unknown')
+                
+                # Failed sessions have the same start and end SOC
+                stats.add_provider_session(provider_name, soc == start_soc)
+    return stats
+
+def get_session_stats(data, start_date=None, end_date=None):
+    stats = ProviderStats()
+    for session in data:
+        # Filter by date range if provided
+        session_start_time = session['start_time']
+        if start_date and end_date:
+            if not (start_date <= session_start_time <= end_date):
+                continue
+        stats.add(session)
+    return stats.session_stats()
@@ -0,0 +1,155 @@
+"""Normalization of raw CarData charging sessions and statistics over normalized sessions."""
+import datetime
+
+# Average grid power (kW) at or above which a session counts as DC charging
+DC_POWER_THRESHOLD_KW = 12
+
+# Function to classify a normalized session as DC charging
+def is_dc_session(session):
+    return session['avg_power'] >= DC_POWER_THRESHOLD_KW
+
+# Function to get the seconds from the start of a session to the start and end of a charging block (None without block times)
+def block_offsets(block, session_start):
+    start = block.get('startTime')
+    end = block.get('endTime')
+    if start is None or end is None:
+        return None
+    return [start - session_start, end - session_start]
+
+# Function to normalize a single raw CarData session (raises KeyError on incomplete sessions)
+def process_session(session):
+    start_time = datetime.datetime.fromtimestamp(session['startTime'])
+    end_time = datetime.datetime.fromtimestamp(session['endTime'])
+    soc_start = session['displayedStartSoc']
+    soc_end = session['displayedSoc']
+    energy_from_grid = session['energyConsumedFromPowerGridKwh']
+    cost = session.get('chargingCostInformation', {}).get('calculatedChargingCost', 0)
+    blocks = session.get('chargingBlocks', [])
+    grid_power_start = [block.get('averagePowerGridKw', 0) for block in blocks]
+    avg_power = sum(grid_power_start) / max(len(grid_power_start), 1)
+
+    # Check if energyIncreaseHvbKwh exists in the data
+    energy_increase_hvb = session.get('energyIncreaseHvbKwh')
+    if energy_increase_hvb is None:
+        # Use different efficiency estimates based on charging type
+        if avg_power >= DC_POWER_THRESHOLD_KW:  # DC charging (typically >= 12kW)
+            energy_increase_hvb = energy_from_grid * 0.98  # 98% efficiency for DC
+        else:  # AC charging
+            energy_increase_hvb = energy_from_grid * 0.92  # 92% efficiency for AC
+
+    efficiency = energy_increase_hvb / energy_from_grid if energy_from_grid else 0
+    location = session.get('chargingLocation', {}).get('formattedAddress', 'Unknown Location')
+    latitude = session.get('chargingLocation', {}).get('mapMatchedLatitude', 0)
+    longitude = session.get('chargingLocation', {}).get('mapMatchedLongitude', 0)
+    mileage = session.get('mileage', 0)
+    session_time_minutes = (end_time - start_time).total_seconds() / 60
+    provider = session.get('publicChargingPoint', {}).get('potentialChargingPointMatches', [{}])[0].get('providerName', 'Unknown')
+
+    return {
+        'start_time': start_time,
+        'end_time': end_time,
+        'soc_start': soc_start,
+        'soc_end': soc_end,
+        'energy_from_grid': energy_from_grid,
+        'energy_added_hvb': energy_increase_hvb,
+        'cost': cost,
+        'efficiency': efficiency,
+        'location': location,
+        'latitude': latitude,
+        'longitude': longitude,
+        'avg_power': avg_power,
+        'grid_power_start': grid_power_start,
+        'block_offsets': [block_offsets(block, session['startTime']) for block in blocks],  # [start, end] seconds per block
+        'mileage': mileage,
+        'session_time_minutes': session_time_minutes,
+        'provider': provider,  # Add provider name
+        'using_estimated_energy': energy_increase_hvb != session.get('energyIncreaseHvbKwh')
+    }
+
+# Function to lazily normalize raw sessions together with their raw charging blocks, skipping incomplete ones
+def iter_sessions_with_blocks(data):
+    for session in data:
+        try:
+            yield process_session(session), session.get('chargingBlocks', [])
+        except KeyError:
+            continue
+
+# Function to lazily normalize raw sessions, skipping incomplete ones
+def iter_sessions(data):
+    for session, _ in iter_sessions_with_blocks(data):
+        yield session
+
+# Function to process JSON data
+def process_data(data):
+    sessions = list(iter_sessions(data))
+    using_estimated_values = any(s['using_estimated_energy'] for s in sessions)
+    return sessions, using_estimated_values
+
+# Function to calculate estimated battery capacity (SoH)
+def calculate_estimated_battery_capacity(sessions):
+    estimated_battery_capacity = []
+    for session in sessions:
+        if session['energy_added_hvb'] >= 30:
+            soc_change = session['soc_end'] - session['soc_start']
+            if soc_change != 0:
+                estimated_capacity = (session['energy_added_hvb'] * 100) / soc_change
+            else:
+                estimated_capacity = 0
+            estimated_battery_capacity.append({
+                'date': session['start_time'],
+                'estimated_battery_capacity': estimated_capacity,
+                'soc_change': soc_change
+            })
+    return estimated_battery_capacity
+
+# Function to calculate overall efficiency and power consumption
+def calculate_overall_stats(sessions):
+    total_energy_added = sum(s['energy_added_hvb'] for s in sessions)
+    total_energy_from_grid = sum(s['energy_from_grid'] for s in sessions)
+    if sessions:
+        total_distance = max(s['mileage'] for s in sessions) - min(s['mileage'] for s in sessions)
+    else:
+        total_distance = max(s['mileage'] for s in sessions) if sessions else 0
+    
+    overall_efficiency = (total_energy_added / total_energy_from_grid) if total_energy_from_grid else 0
+    power_consumption_per_100km = (total_energy_from_grid / total_distance) * 100 if total_distance else 0
+    power_consumption_per_100km_without_grid_losses = (total_energy_added / total_distance) * 100 if total_distance else 0
+    
+    return overall_efficiency, power_consumption_per_100km, power_consumption_per_100km_without_grid_losses
+
+# Function to count sessions by end SoC
+def calculate_soc_statistics(data):
+    above_80_count = 0
+    exactly_100_count = 0
+    below_80_count = 0
+    exactly_80_count = 0
+    total_sessions = 0
+    failed_sessions = 0
+
+    for session in data:
+        total_sessions += 1
+
+        soc = session['soc_end']
+        start_soc = session['soc_start']
+
+        if soc == start_soc:
+            failed_sessions += 1
+            continue
+
+        if soc < 80:
+            below_80_count += 1
+        elif soc == 80:
+            exactly_80_count += 1
+        elif soc > 80:
+            above_80_count += 1
+        if soc == 100:
+            exactly_100_count += 1
+
+    return {
+        'total_sessions': total_sessions,
+        'failed_sessions': failed_sessions,
+        'below_80_count': below_80_count,
+        'exactly_80_count': exactly_80_count,
+        'above_80_count': above_80_count,
+        'exactly_100_count': exactly_100_count
+    }
@@ -0,0 +1,105 @@
+"""Every scalar statistic of the dashboard, computed in a single pass over the sessions."""
+from dataclasses import dataclass
+from bmwtools.sessions import DC_POWER_THRESHOLD_KW
+
+@dataclass(frozen=True)
+class SessionSummary:
+    """Scalar statistics of a set of normalized sessions.
+
+    The derived properties give the same values as calculate_overall_stats,
+    calculate_soc_statistics and get_session_stats on the same sessions.
+    """
+    total_sessions: int = 0
+    failed_sessions: int = 0
+    dc_energy_added: float = 0.0
+    ac_energy_added: float = 0.0
+    energy_from_grid: float = 0.0
+    mileage_min: int = 0
+    mileage_max: int = 0
+    soc_below_80: int = 0
+    soc_exactly_80: int = 0
+    soc_above_80: int = 0
+    soc_exactly_100: int = 0
+
+    @property
+    def successful_sessions(self):
+        return self.total_sessions - self.failed_sessions
+
+    @property
+    def energy_added(self):
+        return self.dc_energy_added + self.ac_energy_added
+
+    @property
+    def distance(self):
+        return self.mileage_max - self.mileage_min
+
+    @property
+    def overall_efficiency(self):
+        return self.energy_added / self.energy_from_grid if self.energy_from_grid else 0
+
+    @property
+    def power_consumption_per_100km(self):
+        return self.energy_from_grid / self.distance * 100 if self.distance else 0
+
+    @property
+    def power_consumption_per_100km_without_grid_losses(self):
+        return self.energy_added / self.distance * 100 if self.distance else 0
+
+    def soc_statistics(self):
+        """Same dict as calculate_soc_statistics."""
+        return {
+            'total_sessions': self.total_sessions,
+            'failed_sessions': self.failed_sessions,
+            'below_80_count': self.soc_below_80,
+            'exactly_80_count': self.soc_exactly_80,
+            'above_80_count': self.soc_above_80,
+            'exactly_100_count': self.soc_exactly_100
+        }
+
+def summarize_sessions(sessions):
+    """SessionSummary of the sessions, in one traversal instead of one per statistic."""
+    total_sessions = failed_sessions = 0
+    dc_energy_added = ac_energy_added = energy_from_grid = 0.0
+    mileage_min = mileage_max = None
+    soc_below_80 = soc_exactly_80 = soc_above_80 = soc_exactly_100 = 0
+
+    for s in sessions:
+        total_sessions += 1
+        energy_added = s['energy_added_hvb']
+        if s['avg_power'] >= DC_POWER_THRESHOLD_KW:
+            dc_energy_added += energy_added
+        else:
+            ac_energy_added += energy_added
+        energy_from_grid += s['energy_from_grid']
+
+        mileage = s['mileage']
+        if mileage_min is None or mileage < mileage_min:
+            mileage_min = mileage
+        if mileage_max is None or mileage > mileage_max:
+            mileage_max = mileage
+
+        soc_end = s['soc_end']
+        if soc_end == s['soc_start']:
+            failed_sessions += 1
+        elif soc_end < 80:
+            soc_below_80 += 1
+        elif soc_end == 80:
+            soc_exactly_80 += 1
+        else:
+            soc_above_80 += 1
+            if soc_end == 100:
+                soc_exactly_100 += 1
+
+    return SessionSummary(
+        total_sessions=total_sessions,
+        failed_sessions=failed_sessions,
+        dc_energy_added=dc_energy_added,
+        ac_energy_added=ac_energy_added,
+        energy_from_grid=energy_from_grid,
+        mileage_min=mileage_min or 0,
+        mileage_max=mileage_max or 0,
+        soc_below_80=soc_below_80,
+        soc_exactly_80=soc_exactly_80,
+        soc_above_80=soc_above_80,
+        soc_exactly_100=soc_exactly_100
+    )
@@ -1,288 +1,421 @@
-from dash import Input, Output, State, html
+from dash import ClientsideFunction, Input, Output, State, html, no_update
 import json
 import base64
 import datetime
-import plotly.graph_objs as go
-from concurrent.futures import ThreadPoolExecutor
-from utils import process_data, create_gauge_trace, calculate_overall_stats, create_scatter_plot, calculate_estimated_battery_capacity, create_folium_map
-from successful_failed_sessions import get_session_stats
-from draw_chargers import create_map_string
-from check_endSoC import calculate_soc_statistics
+import logging
+import uuid
+import numpy as np
+from bmwtools import jsonio
+from figure_specs import figure, scatter, colorscale
+from utils import process_data, create_gauge_trace, create_scatter_plot, calculate_estimated_battery_capacity, create_folium_map_template
+from draw_chargers import create_site_map_string
+from aggregate_index import AggregateIndex
+from charging_curves import ChargingCurveCube
+from map_aggregation import LocationGrid, create_aggregated_map
+from sites import assign_sites
+from session_search import SessionSearchIndex
+from dataset_cache import dataset_key, get_dataset, get_or_build_dataset, result_key, get_result, put_result
+from wire_format import encode_sessions, decode_sessions
+from background_jobs import report_stage, worker_slot
+from output_diff import skip_unchanged
+from payload import quantize, optimize_outputs, check_budget
+from stats_api import put_stats_dataset
+
+logger = logging.getLogger(__name__)
+
+# Dataset cache key of the bundled demo data
+DEMO_DATASET_KEY = 'demo'
+
+# Modes of the charging locations map: one marker per location or sessions aggregated into cells
+MAP_MODE_MARKERS = 'markers'
+MAP_MODE_AGGREGATED = 'aggregated'
+
+WARNING_STYLE = {'textAlign': 'center', 'color': 'orange', 'fontWeight': 'bold', 'margin': '10px', 'display': 'none'}
+
+# Function to return the outputs of upload_json when there is nothing to show
+def empty_upload_outputs():
+    return None, {}, None, [], {}, {}, {}, [], [], "", {}, {}, {}, [], None, WARNING_STYLE, None
+
+# Function to create a figure of gauge traces
+def create_gauge_figure(traces, height=300, width=300):
+    return figure(traces, height=height, width=width, template_name='plotly_white')
+
+# Function to plot the grid power of all sessions over their estimated SoC, with the typical curve
+def create_charging_curves_plot(curves, lo, hi):
+    data = []
+    for row in curves.power[lo:hi]:
+        binned = np.flatnonzero(~np.isnan(row))
+        if not len(binned):
+            continue
+        # Bins outside the SoC range of the session would only be sent as NaN
+        first, last = binned[0], binned[-1] + 1
+        data.append(scatter(
+            x=quantize(curves.soc_bins[first:last], '%'),
+            y=quantize(row[first:last], 'kW'),
+            mode='lines',
+            line=dict(width=1),
+            opacity=0.4
+        ))
+    data.append(scatter(
+        x=quantize(curves.soc_bins, '%'),
+        y=quantize(curves.median_curve(slice(lo, hi)), 'kW'),
+        mode='lines',
+        line=dict(color='red', width=3),
+        name='Typical (median)'
+    ))
+    return figure(
+        data,
+        title='Grid Power over SoC Across All Sessions',
+        xaxis_title='Estimated SoC (%)',
+        yaxis_title='Grid Power (kW)',
+        template_name='plotly_white',
+        showlegend=False
+    )
+
+# Function to create the charging locations map of the sessions in [lo, hi) in the selected mode
+def create_charging_locations_map(key, dataset, map_mode, lo, hi):
+    # Cached, as folium generates new element ids for every rendering of the same map
+    map_key = result_key(key, 'map', map_mode, lo, hi)
+    map_html_content = get_result(map_key)
+    if map_html_content is not None:
+        return map_html_content
+    if map_mode == MAP_MODE_AGGREGATED:
+        map_html_content = create_aggregated_map(dataset['grid'], lo, hi)
+    else:
+        map_html_content = create_site_map_string(dataset['sites'], dataset['index'].sessions_in_range(lo, hi))
+    return put_result(map_key, map_html_content)
+
+# Outputs of upload_json
+UPLOAD_OUTPUTS = [
+    Output('session-dropdown', 'value'),
+    Output('total-energy-gauge', 'figure'),
+    Output('driven-distance', 'data'),
+    Output('session-data', 'data'),
+    Output('total-sessions-gauge', 'figure'),
+    Output('failed-sessions-gauge', 'figure'),
+    Output('successful-sessions-gauge', 'figure'),
+    Output('top-failed-providers', 'children'),
+    Output('top-successful-providers', 'children'),
+    Output('charging-locations-map', 'srcDoc'),
+    Output('overall-efficiency-gauge', 'figure'),
+    Output('power-consumption-gauge', 'figure'),
+    Output('power-consumption-without-grid-losses-gauge', 'figure'),
+    Output('soc-stats', 'children'),
+    Output('energy-data-warning', 'children'),
+    Output('energy-data-warning', 'style'),
+    Output('dataset-handle', 'data')
+]
+
+# Id of the upload response, new for every response and always sent
+TOKEN_OUTPUT = Output('outputs-token', 'data')
+
+# Outputs the browser changes itself, these are always sent
+BROWSER_OUTPUTS = [Output('session-dropdown', 'value'), TOKEN_OUTPUT]
+
+# Function to return the id the outputs sent to a client are recorded under, per upload response it received
+def client_view(client_id, token):
+    return client_id and f"{client_id}:{token}"
+
+# Function to answer every output the client already shows with no_update
+def diff_outputs(view, outputs, values, shown_view=None):
+    return skip_unchanged(view, [None if output in BROWSER_OUTPUTS else str(output) for output in outputs], values, shown_view)
+
+# Function to prepare the outputs of a callback for the client: figures optimized, unchanged outputs skipped, size checked
+def send_outputs(name, view, outputs, values, shown_view=None):
+    sent = diff_outputs(view, outputs, optimize_outputs(values), shown_view)
+    check_budget(name, values, sent)
+    return sent
+
+# Function to create the figures over all sessions in [lo, hi) of a cached dataset, or over decoded sessions without dataset
+def build_dataset_figures(sessions, dataset=None, lo=0, hi=None):
+    # Overview scatterplot
+    overview_fig = figure(
+        [scatter(
+            x=[s['start_time']],
+            y=[quantize(s['energy_added_hvb'], 'kWh')],
+            mode='markers',
+            marker=dict(size=10, color='blue'),
+            name=f"{s['start_time'].strftime('%Y-%m-%d %H:%M')} - {[s['energy_added_hvb']]} kWh - {s['location']}"
+        ) for s in sessions],
+        showlegend=True,
+        title='Energy added per charging session',
+        yaxis_title='kWh',
+        xaxis_title='Date',
+    )
+
+    # Grid power curves of all sessions, over SoC while the dataset is cached on the server
+    if dataset is not None:
+        avg_gridpower_fig = create_charging_curves_plot(dataset['curves'], lo, hi)
+    else:
+        avg_gridpower_fig = figure(
+            [scatter(
+                x=[i for i in range(len(s['grid_power_start']))],
+                y=quantize(s['grid_power_start'], 'kW'),
+                mode='lines',
+                marker=dict(size=6, color=s['grid_power_start'], colorscale=colorscale('Viridis'), showscale=False),
+                name=f"Session {s['start_time']}"
+            ) for s in sessions],
+            title='Average Grid Power Across All Sessions',
+            xaxis_title='Charging Block',
+            yaxis_title='Grid Power (kW)',
+            template_name='plotly_white',
+            showlegend=False
+        )
+
+    # Estimated Battery Capacity scatterplot
+    estimated_battery_capacity_data = calculate_estimated_battery_capacity(sessions)
+    estimated_battery_capacity_fig = create_scatter_plot(
+        x=[data['date'] for data in estimated_battery_capacity_data],
+        y=quantize([data['estimated_battery_capacity'] for data in estimated_battery_capacity_data], 'kWh'),
+        title='Estimated Battery Capacity (SoH) Over Time - Guesstimated',
+        xaxis_title='Date',
+        yaxis_title='kWh',
+        color='red',
+        trendline=True  # Add trendline
+    )
+
+    # Folium map of all sessions, centered on the selected session in the browser
+    map_template = create_folium_map_template(sessions, dataset['sites'] if dataset is not None else None)
+
+    return overview_fig, avg_gridpower_fig, estimated_battery_capacity_fig, map_template
+
+# Function to compute the outputs of upload_json, reporting its stages through set_progress
+def build_upload_outputs(set_progress, contents, n_clicks, start_date, end_date, map_mode):
+    if contents:
+        content_type, content_string = contents.split(',')
+        decoded = base64.b64decode(content_string)
+        key = dataset_key(decoded)
+
+        def load_data():
+            return jsonio.loads(decoded)
+    elif n_clicks > 0:
+        key = DEMO_DATASET_KEY
+
+        def load_data():
+            with open('FINAL_DEMO_CHARGING_DATA_SMOOTH_CURVES.JSON', 'rb') as f:
+                return jsonio.load(f)
+    else:
+        return empty_upload_outputs()
+
+    # Parse and index every dataset only once, date range changes reuse the cached index
+    def build_dataset():
+        data = load_data()
+        sessions, using_estimated_values = process_data(data)
+        # Sites are clustered once over the whole dataset, date ranges only select sessions
+        sites = assign_sites(sessions)
+        index = AggregateIndex(sessions)
+        # The statistics API can answer for this dataset too, by the same key
+        put_stats_dataset(key, index, using_estimated_values)
+        # Only structures derived from the sessions are kept, never the raw upload
+        return {
+            'using_estimated_values': using_estimated_values,
+            'index': index,
+            'sites': sites,
+            'curves': ChargingCurveCube(index.sessions, normalizer=index.normalizer),
+            'grid': LocationGrid(index.sessions, columns=index.columns),
+            'search': SessionSearchIndex(index.sessions)
+        }
+
+    report_stage(set_progress, 'Parsing sessions')
+    try:
+        dataset = get_or_build_dataset(key, build_dataset)
+    except json.JSONDecodeError:
+        return empty_upload_outputs()
+    using_estimated_values = dataset['using_estimated_values']
+    index = dataset['index']
+
+    # Filter sessions by date range if selected, the dashboard ignores a range with a single date
+    if start_date and end_date:
+        start_date = datetime.datetime.fromisoformat(start_date)
+        end_date = datetime.datetime.fromisoformat(end_date)
+        lo, hi = index.range(start_date, end_date)
+    else:
+        lo, hi = index.range()
+    sessions = index.sessions_in_range(lo, hi)
+
+    # Every scalar of the gauges and SoC statistics at once
+    summary = index.summary(lo, hi)
+    if start_date and end_date:
+        current_km = summary.distance
+    else:
+        current_km = summary.mileage_max
+
+    report_stage(set_progress, 'Building map')
+    map_html_content = create_charging_locations_map(key, dataset, map_mode, lo, hi)
+
+    report_stage(set_progress, 'Calculating statistics')
+    total_energy_fig = create_gauge_figure([
+        create_gauge_trace(summary.dc_energy_added, "Total DC Energy (kWh)", "blue", [0, 0.28], range_max=summary.energy_added + 10),
+        create_gauge_trace(summary.ac_energy_added, "Total AC Energy (kWh)", "green", [0.36, 0.64], range_max=summary.energy_added + 10),
+        create_gauge_trace(summary.energy_added, "Total Energy (AC + DC)", "purple", [0.72, 1], range_max=summary.energy_added + 20)
+    ], height=400, width=900)
+
+    total_sessions_fig = create_gauge_figure([create_gauge_trace(summary.total_sessions, "Total Sessions", "blue", [0, 1], range_max=summary.total_sessions)])
+    failed_sessions_fig = create_gauge_figure([create_gauge_trace(summary.failed_sessions, "Failed Sessions", "red", [0, 1], range_max=summary.total_sessions)])
+    successful_sessions_fig = create_gauge_figure([create_gauge_trace(summary.successful_sessions, "Successful Sessions", "green", [0, 1], range_max=summary.total_sessions)])
+    session_stats = index.session_stats(lo, hi)
+    top_failed_providers = [
+        html.Li(f"{provider}: {count} failed sessions at {index.provider_sites(provider, lo, hi, failed=True)} sites")
+        for provider, count in session_stats['top_failed_providers']
+    ]
+    top_successful_providers = [
+        html.Li(f"{provider}: {count} successful sessions at {index.provider_sites(provider, lo, hi, failed=False)} sites")
+        for provider, count in session_stats['top_successful_providers']
+    ]
+
+    overall_efficiency_fig = create_gauge_figure([create_gauge_trace(summary.overall_efficiency * 100, "Overall Efficiency (%)", "blue", [0, 1], range_max=100)])
+    
+    # Prepare the warning message for when estimated energy values are being used
+    warning_message = None
+    warning_style = dict(WARNING_STYLE)
+    
+    if using_estimated_values:
+        warning_message = "⚠️ Warning: Your JSON file is missing 'energyIncreaseHvbKwh' data. Energy values are estimated using 98% efficiency for DC charging and 92% efficiency for AC charging."
+        warning_style['display'] = 'block'
+    
+    power_consumption_fig = create_gauge_figure([create_gauge_trace(summary.power_consumption_per_100km, "Avg Power Consumption (kWh/100km)", "green", [0, 1], range_max=summary.power_consumption_per_100km)])
+    
+    power_consumption_without_grid_losses_fig = create_gauge_figure([create_gauge_trace(summary.power_consumption_per_100km_without_grid_losses, "Avg Consumption w/o Grid Losses (kWh/100km)", "purple", [0, 1], range_max=summary.power_consumption_per_100km)])
+
+    soc_stats = [
+        html.Li(f"Total Sessions: {summary.total_sessions}"),
+        html.Li(f"Sessions with end SoC > 80%: {summary.soc_above_80}"),
+        html.Li(f"Sessions with end SoC = 100%: {summary.soc_exactly_100}"),
+        html.Li(f"Sessions with end SoC < 80%: {summary.soc_below_80}"),
+        html.Li(f"Sessions with end SoC = 80%: {summary.soc_exactly_80}"),
+        html.Li(f"Failed Sessions: {summary.failed_sessions}")
+    ]
+
+    # Speculatively render the figures over all sessions, which update_dataset_figures is asked for right after this job
+    report_stage(set_progress, 'Rendering figures')
+    try:
+        put_result(result_key(key, 'figures', lo, hi), build_dataset_figures(sessions, dataset, lo, hi))
+    except Exception:
+        # Only a head start, update_dataset_figures renders them again and reports the error to the user
+        logger.exception('Rendering the figures of the upload failed')
+
+    # Uncompressed, so the clientside callbacks can read the sessions
+    return 0, total_energy_fig, current_km, encode_sessions(sessions), total_sessions_fig, failed_sessions_fig, successful_sessions_fig, top_failed_providers, top_successful_providers, map_html_content, overall_efficiency_fig, power_consumption_fig, power_consumption_without_grid_losses_fig, soc_stats, warning_message, warning_style, {'key': key, 'lo': lo, 'hi': hi}
 
 def register_callbacks(app):
     @app.callback(
-        [Output('session-dropdown', 'options'),
-         Output('session-dropdown', 'value'),
-         Output('total-energy-gauge', 'figure'),
-         Output('current-km-gauge', 'figure'),
-         Output('session-data', 'data'),
-         Output('total-sessions-gauge', 'figure'),
-         Output('failed-sessions-gauge', 'figure'),
-         Output('successful-sessions-gauge', 'figure'),
-         Output('top-failed-providers', 'children'),
-         Output('top-successful-providers', 'children'),
-         Output('charging-locations-map', 'srcDoc'),
-         Output('overall-efficiency-gauge', 'figure'),
-         Output('power-consumption-gauge', 'figure'),
-         Output('power-consumption-without-grid-losses-gauge', 'figure'),
-         Output('soc-stats', 'children'),
-         Output('energy-data-warning', 'children'),
-         Output('energy-data-warning', 'style')],
+        UPLOAD_OUTPUTS + [TOKEN_OUTPUT],
         [Input('upload-json', 'contents'),
          Input('load-demo-data', 'n_clicks'),
          Input('date-picker-range', 'start_date'),
          Input('date-picker-range', 'end_date'),
-         Input('toggle-units', 'n_clicks')]
+         State('map-mode', 'value'),
+         State('client-id', 'data'),
+         State('outputs-token', 'data')],
+        background=True,
+        progress=[Output('upload-progress', 'value'),
+                  Output('upload-progress', 'max'),
+                  Output('upload-status', 'children')],
+        cancel=[Input('cancel-upload', 'n_clicks')],
+        running=[(Output('upload-progress-container', 'style'), {'display': 'block'}, {'display': 'none'}),
+                 (Output('cancel-upload', 'disabled'), False, True)]
     )
-    def upload_json(contents, n_clicks, start_date, end_date, toggle_units):
-        if contents:
-            content_type, content_string = contents.split(',')
-            decoded = base64.b64decode(content_string)
-            try:
-                data = json.loads(decoded)
-            except json.JSONDecodeError:
-                return [], None, {}, {}, [], {}, {}, {}, [], "", "", {}, {}, {}, ""
-        elif n_clicks > 0:
-            with open('FINAL_DEMO_CHARGING_DATA_SMOOTH_CURVES.JSON', 'r') as f:
-                data = json.load(f)
-        else:
-            return [], None, {}, {}, [], {}, {}, {}, [], "", "", {}, {}, {}, ""
-
-        sessions, using_estimated_values = process_data(data)
-
-        # Filter sessions by date range if selected
-        if start_date and end_date:
-            start_date = datetime.datetime.fromisoformat(start_date)
-            end_date = datetime.datetime.fromisoformat(end_date)
-            sessions = [s for s in sessions if start_date <= s['start_time'] <= end_date]
-
-        options = [
-            {'label': f"{s['start_time'].strftime('%Y-%m-%d %H:%M')} - {s['location']}", 'value': i}
-            for i, s in enumerate(sessions)
-        ]
-
-        def calculate_total_energy():
-            total_energy_dc = sum(s['energy_added_hvb'] for s in sessions if s['avg_power'] >= 12)
-            total_energy_ac = sum(s['energy_added_hvb'] for s in sessions if s['avg_power'] < 12)
-            total_energy_fig = go.Figure()
-            total_energy_fig.add_trace(create_gauge_trace(total_energy_dc, "Total DC Energy (kWh)", "blue", [0, 0.28], range_max=total_energy_dc + total_energy_ac + 10))
-            total_energy_fig.add_trace(create_gauge_trace(total_energy_ac, "Total AC Energy (kWh)", "green", [0.36, 0.64], range_max=total_energy_dc + total_energy_ac + 10))
-            total_energy_fig.add_trace(create_gauge_trace(total_energy_dc + total_energy_ac, "Total Energy (AC + DC)", "purple", [0.72, 1], range_max=total_energy_dc + total_energy_ac + 20))
-            total_energy_fig.update_layout(height=400, width=900, template='plotly_white')
-            return total_energy_fig
-
-        def calculate_current_km():
-            if start_date and end_date:
-                current_km = max(s['mileage'] for s in sessions) - min(s['mileage'] for s in sessions) if sessions else 0
-            else:
-                current_km = max(s['mileage'] for s in sessions) if sessions else 0
-            current_km_fig = go.Figure()
-            current_km_fig.add_trace(create_gauge_trace(current_km, "Driven km", "orange", [0, 1], range_max=current_km))
-            current_km_fig.update_layout(height=400, width=300, template='plotly_white')
-            return current_km_fig
-
-        def calculate_session_stats():
-            return get_session_stats(data=sessions, start_date=start_date, end_date=end_date)
-
-        def calculate_map_html():
-            return create_map_string(data, start_date, end_date)
-
-        def calculate_overall_efficiency():
-            return calculate_overall_stats(sessions)
-
-        def calculate_soc_stats():
-            return calculate_soc_statistics(sessions)
-
-        with ThreadPoolExecutor() as executor:
-            total_energy_future = executor.submit(calculate_total_energy)
-            current_km_future = executor.submit(calculate_current_km)
-            session_stats_future = executor.submit(calculate_session_stats)
-            map_html_future = executor.submit(calculate_map_html)
-            overall_efficiency_future = executor.submit(calculate_overall_efficiency)
-            soc_stats_future = executor.submit(calculate_soc_stats)
-
-            total_energy_fig = total_energy_future.result()
-            current_km_fig = current_km_future.result()
-            session_stats = session_stats_future.result()
-            map_html_content = map_html_future.result()
-            overall_efficiency, power_consumption_per_100km, power_consumption_per_100km_without_grid_losses = overall_efficiency_future.result()
-            soc_stats_data = soc_stats_future.result()
-
-        total_sessions_fig = go.Figure()
-        failed_sessions_fig = go.Figure()
-        successful_sessions_fig = go.Figure()
-        total_sessions_fig.add_trace(create_gauge_trace(session_stats['total_sessions'], "Total Sessions", "blue", [0, 1], range_max=session_stats['total_sessions']))
-        failed_sessions_fig.add_trace(create_gauge_trace(session_stats['total_failed_sessions'], "Failed Sessions", "red", [0, 1], range_max=session_stats['total_sessions']))
-        successful_sessions_fig.add_trace(create_gauge_trace(session_stats['total_successful_sessions'], "Successful Sessions", "green", [0, 1], range_max=session_stats['total_sessions']))
-        total_sessions_fig.update_layout(height=300, width=300, template='plotly_white')
-        failed_sessions_fig.update_layout(height=300, width=300, template='plotly_white')
-        successful_sessions_fig.update_layout(height=300, width=300, template='plotly_white')
-        top_failed_providers = [html.Li(f"{provider}: {count} failed sessions") for provider, count in session_stats['top_failed_providers']]
-        top_successful_providers = [html.Li(f"{provider}: {count} successful sessions") for provider, count in session_stats['top_successful_providers']]
-
-        overall_efficiency_fig = go.Figure()
-        overall_efficiency_fig.add_trace(create_gauge_trace(overall_efficiency * 100, "Overall Efficiency (%)", "blue", [0, 1], range_max=100))
-        overall_efficiency_fig.update_layout(height=300, width=300, template='plotly_white')
-        
-        # Prepare the warning message for when estimated energy values are being used
-        warning_message = None
-        warning_style = {'textAlign': 'center', 'color': 'orange', 'fontWeight': 'bold', 'margin': '10px', 'display': 'none'}
-        
-        if using_estimated_values:
-            warning_message = "⚠️ Warning: Your JSON file is missing 'energyIncreaseHvbKwh' data. Energy values are estimated using 98% efficiency for DC charging and 92% efficiency for AC charging."
-            warning_style['display'] = 'block'
-        
-        power_consumption_fig = go.Figure()
-        power_consumption_fig.add_trace(create_gauge_trace(power_consumption_per_100km, "Avg Power Consumption (kWh/100km)", "green", [0, 1], range_max=power_consumption_per_100km))
-        power_consumption_fig.update_layout(height=300, width=300, template='plotly_white')
-        
-        power_consumption_without_grid_losses_fig = go.Figure()
-        power_consumption_without_grid_losses_fig.add_trace(create_gauge_trace(power_consumption_per_100km_without_grid_losses, "Avg Consumption w/o Grid Losses (kWh/100km)", "purple", [0, 1], range_max=power_consumption_per_100km))
-        power_consumption_without_grid_losses_fig.update_layout(height=300, width=300, template='plotly_white')
-
-        # Determine if units should be in km or miles
-        use_miles = toggle_units % 2 == 1
-
-        if use_miles:
-            current_miles = current_km * 0.621371
-            current_km_fig = go.Figure()
-            current_km_fig.add_trace(create_gauge_trace(current_miles, "Driven miles", "orange", [0, 1], range_max=current_miles))
-            current_km_fig.update_layout(height=400, width=300, template='plotly_white')
-
-        soc_stats = [
-            html.Li(f"Total Sessions: {soc_stats_data['total_sessions']}"),
-            html.Li(f"Sessions with end SoC > 80%: {soc_stats_data['above_80_count']}"),
-            html.Li(f"Sessions with end SoC = 100%: {soc_stats_data['exactly_100_count']}"),
-            html.Li(f"Sessions with end SoC < 80%: {soc_stats_data['below_80_count']}"),
-            html.Li(f"Sessions with end SoC = 80%: {soc_stats_data['exactly_80_count']}"),
-            html.Li(f"Failed Sessions: {soc_stats_data['failed_sessions']}")
-        ]
-
-        return options, 0, total_energy_fig, current_km_fig, sessions, total_sessions_fig, failed_sessions_fig, successful_sessions_fig, top_failed_providers, top_successful_providers, map_html_content, overall_efficiency_fig, power_consumption_fig, power_consumption_without_grid_losses_fig, soc_stats, warning_message, warning_style
+    def upload_json(set_progress, contents, n_clicks, start_date, end_date, map_mode, client_id, token):
+        # Outputs are diffed against the last response the browser received and recorded under a new
+        # token, so the outputs of a job that is cancelled or superseded are never taken as shown
+        new_token = uuid.uuid4().hex
+        view, shown_view = client_view(client_id, new_token), client_view(client_id, token)
+        if not contents and not n_clicks:
+            return send_outputs('upload_json', view, UPLOAD_OUTPUTS + [TOKEN_OUTPUT], [*empty_upload_outputs(), new_token], shown_view)
+        # Uploads run as background jobs, at most MAX_WORKERS of them at a time
+        report_stage(set_progress, 'Waiting for a free worker')
+        with worker_slot():
+            outputs = build_upload_outputs(set_progress, contents, n_clicks, start_date, end_date, map_mode)
+        # Changing the date range or uploading the same file again leaves most outputs unchanged
+        return send_outputs('upload_json', view, UPLOAD_OUTPUTS + [TOKEN_OUTPUT], [*outputs, new_token], shown_view)
 
     @app.callback(
+        Output('charging-locations-map', 'srcDoc', allow_duplicate=True),
+        [Input('map-mode', 'value'),
+         State('dataset-handle', 'data'),
+         State('client-id', 'data'),
+         State('outputs-token', 'data')],
+        prevent_initial_call=True
+    )
+    def update_map_mode(map_mode, dataset_handle, client_id, token):
+        if not dataset_handle:
+            return no_update
+        dataset = get_dataset(dataset_handle['key'])
+        if dataset is None:
+            return no_update
+        map_html_content = create_charging_locations_map(dataset_handle['key'], dataset, map_mode, dataset_handle['lo'], dataset_handle['hi'])
+        return send_outputs('update_map_mode', client_view(client_id, token), [Output('charging-locations-map', 'srcDoc')], [map_html_content])[0]
+
+    # The session dropdown only receives one page of sessions matching the search
+    @app.callback(
+        Output('session-dropdown', 'options'),
+        [Input('session-dropdown', 'search_value'),
+         Input('dataset-handle', 'data'),
+         State('session-dropdown', 'value')]
+    )
+    def update_session_options(search_value, dataset_handle, value):
+        if not dataset_handle:
+            return []
+        dataset = get_dataset(dataset_handle['key'])
+        if dataset is None:
+            return no_update
+        options = dataset['search'].options(search_value, dataset_handle['lo'], dataset_handle['hi'], selected=value)
+        # Options change with every search, they are not diffed but measured like every other response
+        return send_outputs('update_session_options', None, [Output('session-dropdown', 'options')], [options])[0]
+
+    # Views of the selected session are rendered in the browser (assets/dashboard.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace='bmwtools', function_name='sessionViews'),
         [Output('charge-details-graph', 'figure'),
          Output('session-info', 'children'),
          Output('combined-gauges', 'figure'),
          Output('grid-power-graph', 'figure'),
-         Output('range-map', 'srcDoc'),
-         Output('overview-scatterplot', 'figure'),
-         Output('average-gridpower-scatterplot', 'figure'),
-         Output('estimated-battery-capacity-scatterplot', 'figure')],
+         Output('range-map', 'srcDoc')],
         [Input('session-dropdown', 'value'),
-         State('session-data', 'data')]
+         Input('range-map-template', 'data'),
+         State('session-data', 'data'),
+         State('plotly-template', 'data')]
     )
-    def update_dashboard(selected_session, sessions):
-        if selected_session is None or not sessions:
-            return {}, "", {}, {}, "", {}, {}, {}
-
-        # Convert start_time and end_time back to datetime objects
-        for session in sessions:
-            session['start_time'] = datetime.datetime.fromisoformat(session['start_time'])
-            session['end_time'] = datetime.datetime.fromisoformat(session['end_time'])
-
-        session = sessions[selected_session]
-
-        # Charge details graph
-        charge_details_fig = create_scatter_plot(
-            x=[session['start_time'], session['end_time']],
-            y=[session['soc_start'], session['soc_end']],
-            title='Charge Details',
-            xaxis_title='Time',
-            yaxis_title='SOC (%)',
-            color='blue',
-            mode='lines+markers'
-        )
-
-        # Session info text
-        session_info = f"Energy Added: {session['energy_added_hvb']} kWh, Cost: €{session['cost']}, Efficiency: {session['efficiency']:.2%}, Location: {session['location']}"
-
-        # Combined gauges
-        combined_gauges = go.Figure()
-        combined_gauges.add_trace(create_gauge_trace(session['avg_power'], "Average Grid Power (kW)", "darkblue", [0, 0.45], [0.6, 1], max([s['avg_power'] for s in sessions])))
-        combined_gauges.add_trace(create_gauge_trace(session['cost'], "Cost (€)", "green", [0.55, 1], [0.6, 1], max([s['cost'] for s in sessions])))
-        combined_gauges.add_trace(create_gauge_trace(session['efficiency'] * 100, "Efficiency (%)", "orange", [0, 0.45], [0.2, 0.6], 100))
-        combined_gauges.add_trace(create_gauge_trace(session['energy_added_hvb'], "Energy Added (kWh)", "purple", [0.55, 1], [0.2, 0.6], max([s['energy_added_hvb'] for s in sessions])))
-        combined_gauges.add_trace(create_gauge_trace(session['session_time_minutes'], "Session Time (minutes)", "red", [0.25, 0.75], [0, 0.2], max([s['session_time_minutes'] for s in sessions])))
-        combined_gauges.update_layout(template='plotly_white', height=800)
-
-        # Grid Power over Time graph
-        grid_power_fig = create_scatter_plot(
-            x=[session['start_time'] + datetime.timedelta(seconds=i * (session['end_time'] - session['start_time']).total_seconds() / len(session['grid_power_start'])) for i in range(len(session['grid_power_start']))],
-            y=session['grid_power_start'],
-            title='Grid Power Over Time',
-            xaxis_title='Time',
-            yaxis_title='Grid Power (kW)',
-            color='green',
-            mode='lines+markers'
-        )
-
-        # Check if grid_power_start is not empty
-        if session['grid_power_start']:
-            # Find the peak value and its corresponding time
-            peak_value = max(session['grid_power_start'])
-            peak_index = session['grid_power_start'].index(peak_value)
-            peak_time = session['start_time'] + datetime.timedelta(seconds=peak_index * (session['end_time'] - session['start_time']).total_seconds() / len(session['grid_power_start']))
-
-            # Add a marker for the peak value
-            grid_power_fig.add_trace(go.Scatter(
-                x=[peak_time],
-                y=[peak_value],
-                mode='markers+text',
-                marker=dict(size=12, color='red', symbol='x'),
-                text=[f"Peak: {peak_value:.2f} kW"],
-                textposition='bottom center',
-                name='Peak'
-            ))
-
-        # Overview scatterplot
-        overview_fig = go.Figure()
-        for s in sessions:
-            overview_fig.add_trace(go.Scatter(
-                x=[s['start_time']],
-                y=[s['energy_added_hvb']],
-                mode='markers',
-                marker=dict(size=10, color='blue'),
-                name=f"{s['start_time'].strftime('%Y-%m-%d %H:%M')} - {[s['energy_added_hvb']]} kWh - {s['location']}"
-            ))
-        overview_fig.update_layout(
-            showlegend=True,
-            title='Energy added per charging session',
-            yaxis_title='kWh',
-            xaxis_title='Date',
-        )
 
-        # Average Grid Power scatterplot
-        avg_gridpower_fig = go.Figure()
-        for s in sessions:
-            avg_gridpower_fig.add_trace(go.Scatter(
-                x=[i for i in range(len(s['grid_power_start']))],
-                y=s['grid_power_start'],
-                mode='lines',
-                marker=dict(size=6, color=s['grid_power_start'], colorscale='Viridis', showscale=False),
-                name=f"Session {s['start_time']}"
-            ))
-        avg_gridpower_fig.update_layout(
-            title='Average Grid Power Across All Sessions',
-            xaxis_title='Session Time (minutes)',
-            yaxis_title='Grid Power (kW)',
-            template='plotly_white',
-            showlegend=False
-        )
-
-        # Estimated Battery Capacity scatterplot
-        estimated_battery_capacity_data = calculate_estimated_battery_capacity(sessions)
-        estimated_battery_capacity_fig = create_scatter_plot(
-            x=[data['date'] for data in estimated_battery_capacity_data],
-            y=[data['estimated_battery_capacity'] for data in estimated_battery_capacity_data],
-            title='Estimated Battery Capacity (SoH) Over Time - Guesstimated',
-            xaxis_title='Date',
-            yaxis_title='kWh',
-            color='red',
-            trendline=True  # Add trendline
-        )
+    app.clientside_callback(
+        ClientsideFunction(namespace='bmwtools', function_name='drivenDistanceGauge'),
+        Output('current-km-gauge', 'figure'),
+        [Input('driven-distance', 'data'),
+         Input('toggle-units', 'n_clicks'),
+         State('plotly-template', 'data')]
+    )
 
-        # Generate Folium map
-        map_html_content = create_folium_map(sessions, session)
+    # Figures over all sessions only change with the dataset or date range, not with the selected session
+    dataset_figure_outputs = [
+        Output('overview-scatterplot', 'figure'),
+        Output('average-gridpower-scatterplot', 'figure'),
+        Output('estimated-battery-capacity-scatterplot', 'figure'),
+        Output('range-map-template', 'data')
+    ]
 
-        return charge_details_fig, session_info, combined_gauges, grid_power_fig, map_html_content, overview_fig, avg_gridpower_fig, estimated_battery_capacity_fig
+    @app.callback(
+        dataset_figure_outputs,
+        [Input('dataset-handle', 'data'),
+         State('session-data', 'data'),
+         State('client-id', 'data'),
+         State('outputs-token', 'data')]
+    )
+    def update_dataset_figures(dataset_handle, sessions, client_id, token):
+        # The session-data payload is a dict of columns even without sessions, the handle range tells if any is selected
+        if not dataset_handle or dataset_handle['lo'] >= dataset_handle['hi']:
+            figures = {}, {}, {}, ""
+        else:
+            figures = get_dataset_figures(dataset_handle, sessions)
+        return send_outputs('update_dataset_figures', client_view(client_id, token), dataset_figure_outputs, figures)
+
+# Function to return the figures over all sessions of a dataset handle, rendered by the upload job or now
+def get_dataset_figures(dataset_handle, sessions):
+    key, lo, hi = dataset_handle['key'], dataset_handle['lo'], dataset_handle['hi']
+    figures = get_result(result_key(key, 'figures', lo, hi))
+    if figures is not None:
+        return figures
+
+    dataset = get_dataset(key)
+    if dataset is None:
+        return build_dataset_figures(decode_sessions(sessions))
+    return put_result(result_key(key, 'figures', lo, hi), build_dataset_figures(dataset['index'].sessions_in_range(lo, hi), dataset, lo, hi))
@@ -0,0 +1,90 @@
+import warnings
+import numpy as np
+from bmwtools.sessions import iter_sessions
+from bmwtools.providers import ProviderNormalizer
+
+# Width of the SoC bins of the curve matrix in percent
+SOC_BIN_WIDTH = 2
+
+def block_energies(session):
+    """Energy (kWh) drawn from the grid during each charging block of a normalized session."""
+    return np.array([
+        power * max(offsets[1] - offsets[0], 0) / 3600 if offsets else 0
+        for power, offsets in zip(session['grid_power_start'], session.get('block_offsets') or [])
+    ], dtype=float)
+
+def block_socs(session, energies):
+    """Estimated SoC at the middle of each block.
+
+    The SoC is interpolated between displayedStartSoc and displayedSoc
+    proportionally to the energy charged up to the block.
+    """
+    total = energies.sum()
+    if total <= 0:
+        return None
+    charged = np.cumsum(energies) - energies / 2
+    return session['soc_start'] + (session['soc_end'] - session['soc_start']) * charged / total
+
+class ChargingCurveCube:
+    """Grid power per session and SoC bin, built from the charging blocks (grid power and block offsets) of every session.
+
+    power[i, j] is the energy weighted average grid power of session i while
+    its SoC was in bin j, NaN where the session did not charge in that bin.
+    Rows are ordered by start time like AggregateIndex.sessions, so a date
+    range (lo, hi) of the index selects the rows lo:hi. Fleet, per provider
+    and per session comparisons are reductions over this matrix.
+    """
+
+    def __init__(self, sessions, bin_width=SOC_BIN_WIDTH, normalizer=None):
+        self.bin_width = bin_width
+        normalizer = normalizer or ProviderNormalizer()
+        self.soc_bins = np.arange(0, 100, bin_width) + bin_width / 2  # Bin centers
+        # Normalize each distinct provider once, in order of first appearance
+        canonical = {provider: normalizer.normalize(provider) for provider in dict.fromkeys(s['provider'] for s in sessions)}
+        self.providers = np.array([canonical[s['provider']] for s in sessions], dtype=object)
+        self.power = np.full((len(sessions), len(self.soc_bins)), np.nan)
+
+        for row, session in enumerate(sessions):
+            if not session['grid_power_start'] or session['soc_end'] <= session['soc_start']:
+                continue
+            energies = block_energies(session)
+            socs = block_socs(session, energies)
+            if socs is None:
+                continue
+            powers = np.array(session['grid_power_start'], dtype=float)
+            bins = np.clip((socs // bin_width).astype(int), 0, len(self.soc_bins) - 1)
+            weighted_power = np.bincount(bins, weights=powers * energies, minlength=len(self.soc_bins))
+            bin_energy = np.bincount(bins, weights=energies, minlength=len(self.soc_bins))
+            charged = bin_energy > 0
+            self.power[row, charged] = weighted_power[charged] / bin_energy[charged]
+
+    @classmethod
+    def from_data(cls, data, bin_width=SOC_BIN_WIDTH):
+        """Build the cube from raw CarData sessions, the dashboard builds it from the sessions of its AggregateIndex."""
+        return cls(sorted(iter_sessions(data), key=lambda s: s['start_time']), bin_width)
+
+    def __len__(self):
+        return len(self.power)
+
+    def median_curve(self, rows=slice(None)):
+        """Median grid power per SoC bin over the selected rows (NaN where no session charged)."""
+        return self._median(self.power[rows])
+
+    def provider_curves(self, rows=slice(None)):
+        """Median curve per canonical provider over the selected rows."""
+        providers = self.providers[rows]
+        power = self.power[rows]
+        return {provider: self._median(power[providers == provider]) for provider in np.unique(providers)}
+
+    def _median(self, power):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN bins
+            return np.nanmedian(power, axis=0)
+
+    def compare(self, row, rows=slice(None)):
+        """Curve of one session next to the typical (median) curve of the selected rows."""
+        typical = self.median_curve(rows)
+        session = self.power[row]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = session / typical
+        return {'soc': self.soc_bins, 'session': session, 'typical': typical, 'ratio': ratio}
@@ -7,6 +7,7 @@ from folium import Map, Marker
 import base64
 import hashlib
 import pandas as pd  # Add this import
+from bmwtools import jsonio
 from successful_failed_sessions import get_session_stats
 from draw_chargers import load_data, process_charging_data, create_map_string
 
@@ -367,12 +368,12 @@ def upload_json(contents, n_clicks, start_date, end_date, toggle_units):
         content_type, content_string = contents.split(',')
         decoded = base64.b64decode(content_string)
         try:
-            data = json.loads(decoded)
+            data = jsonio.loads(decoded)
         except json.JSONDecodeError:
             return [], None, {}, {}, [], {}, {}, {}, [], "", "", {}, {}, {}
     elif n_clicks > 0:
         with open('FINAL_DEMO_CHARGING_DATA_SMOOTH_CURVES.JSON', 'r') as f:
-            data = json.load(f)
+            data = jsonio.load(f)
     else:
         return [], None, {}, {}, [], {}, {}, {}, [], "", "", {}, {}, {}
 
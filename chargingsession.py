@@ -1,11 +1,11 @@
-import json
+from bmwtools import jsonio
 import pandas as pd
 import plotly.graph_objs as go
 import datetime
 
 # Load the JSON data
 with open('./path_to_your_json_file.json', 'r') as file:
-    data = json.load(file)
+    data = jsonio.load(file)
 
 # Filter out sessions where the peak averagePowerGridKw is below 20kW
 filtered_data = [
@@ -1,45 +1,10 @@
-import json
-
-def calculate_soc_statistics(data):
-    above_80_count = 0
-    exactly_100_count = 0
-    below_80_count = 0
-    exactly_80_count = 0
-    total_sessions = 0
-    failed_sessions = 0
-
-    for session in data:
-        total_sessions += 1
-
-        soc = session['soc_end']
-        start_soc = session['soc_start']
-
-        if soc == start_soc:
-            failed_sessions += 1
-            continue
-
-        if soc < 80:
-            below_80_count += 1
-        elif soc == 80:
-            exactly_80_count += 1
-        elif soc > 80:
-            above_80_count += 1
-        if soc == 100:
-            exactly_100_count += 1
-
-    return {
-        'total_sessions': total_sessions,
-        'failed_sessions': failed_sessions,
-        'below_80_count': below_80_count,
-        'exactly_80_count': exactly_80_count,
-        'above_80_count': above_80_count,
-        'exactly_100_count': exactly_100_count
-    }
+from bmwtools import jsonio
+from bmwtools.sessions import calculate_soc_statistics
 
 if __name__ == "__main__":
     # Load the JSON data
     with open('./path_to_your_json_file.json') as f:
-        data = json.load(f)
+        data = jsonio.load(f)
 
     # Calculate SOC statistics
     statistics = calculate_soc_statistics(data)
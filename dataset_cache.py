@@ -0,0 +1,85 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Number of uploaded datasets kept in memory, least recently used ones are evicted first
+MAX_DATASETS = 16
+
+# Number of results derived from datasets (e.g. rendered figures) kept in memory
+MAX_RESULTS = 64
+
+# Seconds a dataset or result stays in the disk cache after it was built, about the lifetime of a dashboard session
+DISK_EXPIRE_SECONDS = int(os.environ.get('BMWTOOLS_DATASET_EXPIRE_SECONDS', 30 * 60))
+
+_datasets = OrderedDict()
+_results = OrderedDict()
+_lock = threading.Lock()
+_disk_cache = None
+
+def use_disk_cache(cache):
+    """Also keep datasets in a diskcache.Cache shared with the background job processes.
+
+    Background jobs build datasets in a child process, whose memory is lost
+    when the job ends. With a disk cache the main process loads them from
+    disk on a memory miss instead of building them again.
+    """
+    global _disk_cache
+    _disk_cache = cache
+
+def dataset_key(content):
+    """Identify a dataset by the sha256 of its uploaded bytes."""
+    return hashlib.sha256(content).hexdigest()
+
+def _remember(entries, limit, key, value):
+    with _lock:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > limit:
+            entries.popitem(last=False)
+
+def _get(entries, limit, kind, key):
+    with _lock:
+        value = entries.get(key)
+        if value is not None:
+            entries.move_to_end(key)
+            return value
+    if _disk_cache is None:
+        return None
+    value = _disk_cache.get(f"{kind}:{key}")
+    if value is not None:
+        _remember(entries, limit, key, value)
+    return value
+
+def _put(entries, limit, kind, key, value):
+    _remember(entries, limit, key, value)
+    if _disk_cache is not None:
+        _disk_cache.set(f"{kind}:{key}", value, expire=DISK_EXPIRE_SECONDS)
+    return value
+
+def get_dataset(key):
+    """Return the cached dataset for key or None, marking it as recently used."""
+    return _get(_datasets, MAX_DATASETS, 'dataset', key)
+
+def put_dataset(key, dataset):
+    return _put(_datasets, MAX_DATASETS, 'dataset', key, dataset)
+
+def result_key(key, name, *parts):
+    """Key of a result named name, derived from dataset key and parameters such as a date range."""
+    return ':'.join([key, name, *map(str, parts)])
+
+def get_result(key):
+    """Return a cached derived result (see result_key) or None."""
+    return _get(_results, MAX_RESULTS, 'result', key)
+
+def put_result(key, result):
+    """Cache a derived result, also computed speculatively before anyone asks for it."""
+    return _put(_results, MAX_RESULTS, 'result', key, result)
+
+def get_or_build_dataset(key, build):
+    """Return the cached dataset for key, calling build() to create it on a cache miss."""
+    dataset = get_dataset(key)
+    if dataset is None:
+        # Built outside the lock, concurrent misses for the same key just build it twice
+        dataset = put_dataset(key, build())
+    return dataset
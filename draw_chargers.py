@@ -1,4 +1,4 @@
-import json
+from bmwtools import jsonio
 import folium
 from collections import defaultdict
 from geopy.distance import geodesic
@@ -8,7 +8,7 @@ from datetime import datetime
 def load_data(file_path):
     """Load JSON data from the specified file path."""
     with open(file_path, 'r') as file:
-        return json.load(file)
+        return jsonio.load(file)
 
 def find_close_location(lat, lon, locations, threshold=0.10):
     """Find if a location is close to any existing location within a threshold distance."""
@@ -146,6 +146,27 @@ def create_map_string(charging_data, start_date=None, end_date=None):
     charging_map = create_map_base(locations, location_counts, failed_locations)
     return charging_map._repr_html_() if charging_map else ""
 
+def count_site_visits(sites, sessions):
+    """Count successful and failed visits per site of sessions clustered by sites.assign_sites."""
+    location_counts = defaultdict(int)
+    failed_locations = defaultdict(int)
+    for session in sessions:
+        if session.get('site_id') is None:
+            continue
+        site = sites[session['site_id']]
+        location_key = (site['latitude'], site['longitude'], site['location'])
+        if session['energy_from_grid'] == 0:
+            failed_locations[location_key] += 1
+        else:
+            location_counts[location_key] += 1
+    return list(location_counts), location_counts, failed_locations
+
+def create_site_map_string(sites, sessions):
+    """Create a map of the sites visited by the sessions and return as HTML string, without clustering again."""
+    locations, location_counts, failed_locations = count_site_visits(sites, sessions)
+    charging_map = create_map_base(locations, location_counts, failed_locations)
+    return charging_map._repr_html_() if charging_map else ""
+
 def main():
     """Main function to load data, process it, and create the map."""
     file_path = 'path_to_your_json_file.json'
@@ -1,44 +1,34 @@
 import pandas as pd
-import json
+from bmwtools import jsonio
+from bmwtools.sessions import process_session
+from bmwtools.columns import SessionColumns
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 # Load JSON data
 with open('path_to_your_json_file.json') as file:
-    data = json.load(file)
+    data = jsonio.load(file)
 
-# Initialize lists to hold data
-dates = []
-wasted_energy = []
-charged_energy = []
-session_types = []  # List to identify AC or DC
-preconditioning = []  # List to store preconditioning status
-power_grid = []  # Total power taken from the grid
-power_hvb = []  # Total power for High Voltage battery
+# Sessions with measured battery energy, with their preconditioning status
+sessions = []
+preconditioning = []
+for raw_session in data:
+    if 'energyIncreaseHvbKwh' not in raw_session:
+        continue
+    try:
+        sessions.append(process_session(raw_session))
+    except KeyError:
+        continue
+    preconditioning.append(raw_session.get('isPreconditioningActivated', False))
 
-for session in data:
-    if 'energyConsumedFromPowerGridKwh' in session and 'energyIncreaseHvbKwh' in session:
-        grid_energy = session['energyConsumedFromPowerGridKwh']
-        hvb_energy = session['energyIncreaseHvbKwh']
-        energy_waste = abs(grid_energy - hvb_energy)
-        wasted_energy.append(energy_waste)
-        charged_energy.append(hvb_energy)
-        power_grid.append(grid_energy)
-        power_hvb.append(hvb_energy)
-        dates.append(pd.to_datetime(session['startTime'], unit='s'))  # Convert timestamp to datetime
-
-        total_power = 0
-        count = 0
-        if 'chargingBlocks' in session:
-            for block in session['chargingBlocks']:
-                if 'averagePowerGridKw' in block:
-                    total_power += block['averagePowerGridKw']
-                    count += 1
-
-        average_power = total_power / count if count > 0 else 0
-        is_ac = average_power <= 11
-        session_types.append('AC' if is_ac else 'DC')
-        preconditioning.append(session.get('isPreconditioningActivated', False))
+# Charge type and wasted energy are the shared derived columns of bmwtools.columns
+columns = SessionColumns(sessions)
+dates = [pd.Timestamp(start_time) for start_time in columns['start_time']]
+wasted_energy = [abs(wasted) for wasted in columns['energy_wasted']]
+charged_energy = columns['energy_added_hvb']
+session_types = columns['charge_type']
+power_grid = columns['energy_from_grid']
+power_hvb = columns['energy_added_hvb']
 
 # Create a DataFrame
 df = pd.DataFrame({
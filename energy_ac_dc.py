@@ -1,10 +1,16 @@
 import pandas as pd
-import json
+from bmwtools import jsonio
+from bmwtools.sessions import process_data
+from bmwtools.columns import SessionColumns
 import plotly.graph_objects as go
 
 # Load the JSON data
 with open('./path_to_your_json_file.json') as f:
-    data = json.load(f)
+    data = jsonio.load(f)
+
+# Charge type and peak block power are the shared derived columns of bmwtools.columns
+sessions, _ = process_data(data)
+columns = SessionColumns(sessions)
 
 # Initialize variables to store AC and DC energy and session counts
 ac_energy = 0
@@ -14,26 +20,20 @@ dc_onec_energy = 0
 ac_sessions = 0
 dc_sessions = 0
 
-# Loop through each session and its charging blocks
-for session in data:
-    if 'chargingBlocks' in session and session['chargingBlocks']:
-        # Check if there are any charging blocks to avoid empty max() issue
-        session_energy = session.get('energyConsumedFromPowerGridKwh', 0)  # Total energy for session
-        block_powers = [block['averagePowerGridKw'] for block in session['chargingBlocks']]
-        
-        if block_powers:  # Proceed only if the block_powers list is not empty
-            max_power = max(block_powers)  # Max power in session
-            
-            # Classify charging type and accumulate energy and session count
-            if max_power <= 12:  # AC Charging
-                ac_energy += session_energy
-                ac_sessions += 1
-            elif max_power > 12 and max_power <= 80 :  # DC Charging below one C
-                dc_onec_energy += session_energy
-                dc_onec_sessions += 1
-            else:  # DC Charging
-                dc_energy += session_energy
-                dc_sessions += 1
+# Peak block power (kW) up to which a DC session counts as charging below one C
+DC_BELOW_ONE_C_MAX_KW = 80
+
+for session_energy, charge_type, max_power in zip(columns['energy_from_grid'], columns['charge_type'], columns['max_power']):
+    # Classify charging type and accumulate energy and session count
+    if charge_type == 'AC':
+        ac_energy += session_energy
+        ac_sessions += 1
+    elif max_power <= DC_BELOW_ONE_C_MAX_KW:  # DC Charging below one C
+        dc_onec_energy += session_energy
+        dc_onec_sessions += 1
+    else:  # DC Charging
+        dc_energy += session_energy
+        dc_sessions += 1
 
 # Check the results
 print(f"Total AC Energy: {ac_energy} kWh, Total AC Sessions: {ac_sessions}")
@@ -1,46 +1,36 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-import json
+from bmwtools import jsonio
+from bmwtools.sessions import process_data
+from bmwtools.columns import SessionColumns
 
 # Load JSON data
 with open('path_to_your_json_file.json') as file:
-    data = json.load(file)
+    data = jsonio.load(file)
+
+# Sessions with measured battery energy; charge type and wasted energy are the shared derived columns of bmwtools.columns
+sessions, _ = process_data(session for session in data if 'energyIncreaseHvbKwh' in session)
+columns = SessionColumns(sessions)
 
 # Initialize lists to hold data
-dates = []
+dates = [pd.Timestamp(start_time) for start_time in columns['start_time']]
 ac_wasted_energy = []
 ac_charged_energy = []
 dc_wasted_energy = []
 dc_charged_energy = []
 
-for session in data:
-    if 'energyConsumedFromPowerGridKwh' in session and 'energyIncreaseHvbKwh' in session:
-        grid_energy = session['energyConsumedFromPowerGridKwh']
-        hvb_energy = session['energyIncreaseHvbKwh']
-        energy_waste = abs(grid_energy - hvb_energy)
-        dates.append(pd.to_datetime(session['startTime'], unit='s'))  # Convert timestamp to datetime
-
-        total_power = 0
-        count = 0
-        if 'chargingBlocks' in session:
-            for block in session['chargingBlocks']:
-                if 'averagePowerGridKw' in block:
-                    total_power += block['averagePowerGridKw']
-                    count += 1
-
-        average_power = total_power / count if count > 0 else 0
-        is_ac = average_power <= 11
-
-        if is_ac:
-            ac_wasted_energy.append(energy_waste)
-            ac_charged_energy.append(hvb_energy)
-            dc_wasted_energy.append(0)  # DC sessions have no wasted energy
-            dc_charged_energy.append(0)
-        else:
-            ac_wasted_energy.append(0)
-            ac_charged_energy.append(0)
-            dc_wasted_energy.append(energy_waste)
-            dc_charged_energy.append(hvb_energy)
+for wasted, hvb_energy, charge_type in zip(columns['energy_wasted'], columns['energy_added_hvb'], columns['charge_type']):
+    energy_waste = abs(wasted)
+    if charge_type == 'AC':
+        ac_wasted_energy.append(energy_waste)
+        ac_charged_energy.append(hvb_energy)
+        dc_wasted_energy.append(0)  # DC sessions have no wasted energy
+        dc_charged_energy.append(0)
+    else:
+        ac_wasted_energy.append(0)
+        ac_charged_energy.append(0)
+        dc_wasted_energy.append(energy_waste)
+        dc_charged_energy.append(hvb_energy)
 
 # Create a DataFrame
 df = pd.DataFrame({
@@ -1,9 +1,9 @@
-import json
+from bmwtools import jsonio
 from collections import defaultdict
 
 # Load the JSON data
 with open('./path_to_your_json_file.json') as f:
-    data = json.load(f)
+    data = jsonio.load(f)
 
 # Initialize a dictionary to store the count of failed sessions for each provider
 failed_providers_count = defaultdict(int)
@@ -0,0 +1,63 @@
+import json
+import os
+import plotly.colors
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+
+# Set BMWTOOLS_FIGURE_DEBUG=1 to cross-validate every figure spec against plotly's graph objects
+FIGURE_DEBUG = os.environ.get('BMWTOOLS_FIGURE_DEBUG', '') == '1'
+
+_templates = {}
+
+def template(name=None):
+    """Plain dict of a plotly template, resolved once per name (default: plotly.io.templates.default)."""
+    name = name or pio.templates.default
+    if name not in _templates:
+        _templates[name] = pio.templates[name].to_plotly_json()
+    return _templates[name]
+
+_colorscales = {}
+
+def colorscale(name):
+    """Named colorscale as the list of [position, color] pairs go.Figure would expand it to."""
+    if name not in _colorscales:
+        _colorscales[name] = plotly.colors.get_colorscale(name)
+    return _colorscales[name]
+
+def _to_json(value):
+    return json.loads(json.dumps(value, cls=PlotlyJSONEncoder))
+
+def validate(spec):
+    """Check that go.Figure accepts a spec and serializes it unchanged, raising ValueError otherwise."""
+    import plotly.graph_objs as go
+    validated = _to_json(go.Figure(spec))
+    if validated != _to_json(spec):
+        raise ValueError(f"Figure spec differs from go.Figure: {json.dumps(spec, cls=PlotlyJSONEncoder)[:200]}")
+    return spec
+
+def figure(data=(), title=None, xaxis_title=None, yaxis_title=None, template_name=None, **layout):
+    """Figure as the plain dict go.Figure(...).to_plotly_json() would produce, without validating each property.
+
+    title, xaxis_title and yaxis_title are expanded like in
+    go.Figure.update_layout, the named template is embedded like plotly does
+    when serializing. All other keyword arguments are layout properties.
+    """
+    if title is not None:
+        layout['title'] = {'text': title}
+    if xaxis_title is not None:
+        layout['xaxis'] = dict(layout.get('xaxis', {}), title={'text': xaxis_title})
+    if yaxis_title is not None:
+        layout['yaxis'] = dict(layout.get('yaxis', {}), title={'text': yaxis_title})
+    layout['template'] = template(template_name)
+    spec = {'data': list(data), 'layout': layout}
+    if FIGURE_DEBUG:
+        validate(spec)
+    return spec
+
+def scatter(**properties):
+    """Scatter trace with the given properties."""
+    return dict(type='scatter', **properties)
+
+def indicator(**properties):
+    """Indicator trace with the given properties."""
+    return dict(type='indicator', **properties)
@@ -0,0 +1,151 @@
+import math
+import random
+from itertools import accumulate
+from bmwtools.sessions import calculate_estimated_battery_capacity
+
+# Quantiles of the degradation bands returned by FleetSohAggregator.bands
+BAND_QUANTILES = {'p10': 0.1, 'p50': 0.5, 'p90': 0.9}
+
+class KllSketch:
+    """Mergeable streaming quantile sketch (Karnin, Lang, Liberty 2016).
+
+    Values are kept in a hierarchy of compactors. Whenever a compactor is
+    full it is sorted and every other value is promoted to the next level,
+    where it counts twice. Memory stays around 3 * k values no matter how
+    many values were added, and the rank error is roughly 1.7 / k.
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.n = 0
+        self.compactors = [[]]
+        self._random = random.Random()
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil((2 / 3) ** depth * self.k)) + 1
+
+    def _size(self):
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            compactor = self.compactors[level]
+            if len(compactor) < self._capacity(level):
+                continue
+            if level + 1 == len(self.compactors):
+                self.compactors.append([])
+            compactor.sort()
+            # An odd value stays behind, the rest is halved starting at a random offset
+            keep = compactor.pop() if len(compactor) % 2 else None
+            self.compactors[level + 1].extend(compactor[self._random.randint(0, 1)::2])
+            self.compactors[level] = [keep] if keep is not None else []
+            if self._size() < self._max_size():
+                break
+
+    def add(self, value):
+        self.compactors[0].append(value)
+        self.n += 1
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.n += other.n
+        while self._size() >= self._max_size():
+            self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate value at quantile q (0 <= q <= 1), None if the sketch is empty."""
+        weighted = sorted((value, 2 ** level) for level, compactor in enumerate(self.compactors) for value in compactor)
+        if not weighted:
+            return None
+        cumulative = list(accumulate(weight for _, weight in weighted))
+        target = q * cumulative[-1]
+        for (value, _), rank in zip(weighted, cumulative):
+            if rank >= target:
+                return value
+        return weighted[-1][0]
+
+    def state(self):
+        return {'k': self.k, 'n': self.n, 'compactors': [list(compactor) for compactor in self.compactors]}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['k'])
+        sketch.n = state['n']
+        sketch.compactors = [list(compactor) for compactor in state['compactors']]
+        return sketch
+
+class FleetSohAggregator:
+    """Fleet battery health (estimated capacity in kWh) as quantile sketches per model and month.
+
+    Points are ingested incrementally and only the sketches are kept, so
+    memory does not grow with the number of vehicles. Aggregators built by
+    parallel workers are combined with merge().
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.sketches = {}
+
+    def add_point(self, model, date, estimated_capacity):
+        # Sessions without SoC change produce a capacity of 0, which is no measurement
+        if estimated_capacity <= 0:
+            return
+        key = (model, date.strftime('%Y-%m'))
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.sketches[key] = KllSketch(self.k)
+        sketch.add(estimated_capacity)
+
+    def add_sessions(self, sessions, model):
+        """Ingest the SoH points of one vehicle's normalized sessions."""
+        for point in calculate_estimated_battery_capacity(sessions):
+            self.add_point(model, point['date'], point['estimated_battery_capacity'])
+
+    def merge(self, other):
+        for key, sketch in other.sketches.items():
+            if key in self.sketches:
+                self.sketches[key].merge(sketch)
+            else:
+                self.sketches[key] = KllSketch.from_state(sketch.state())
+        return self
+
+    def models(self):
+        return sorted({model for model, _ in self.sketches})
+
+    def bands(self, model=None):
+        """Monthly p10/p50/p90 of the estimated capacity, for one model or the whole fleet."""
+        monthly = {}
+        for (sketch_model, month), sketch in self.sketches.items():
+            if model is not None and sketch_model != model:
+                continue
+            if month in monthly:
+                monthly[month].merge(sketch)
+            else:
+                monthly[month] = KllSketch.from_state(sketch.state())
+        return [
+            dict({'month': month, 'count': sketch.n}, **{name: sketch.quantile(q) for name, q in BAND_QUANTILES.items()})
+            for month, sketch in sorted(monthly.items())
+        ]
+
+    def state(self):
+        return {
+            'k': self.k,
+            'sketches': [{'model': model, 'month': month, 'sketch': sketch.state()} for (model, month), sketch in self.sketches.items()]
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        aggregator = cls(state['k'])
+        for entry in state['sketches']:
+            aggregator.sketches[(entry['model'], entry['month'])] = KllSketch.from_state(entry['sketch'])
+        return aggregator
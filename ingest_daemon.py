@@ -0,0 +1,198 @@
+import argparse
+import os
+import sys
+import time
+from bmwtools import jsonio
+from bmwtools.ingest import open_archive, iter_processed_chunks, session_key
+from analytics import ACCUMULATORS, accumulate, build_report
+from arrow_store import write_sessions
+from batch import file_sha256, write_json
+from fleet_soh import FleetSohAggregator
+
+# Seconds between two scans of the watched directory
+POLL_INTERVAL = 2.0
+
+# Seconds a file must be unchanged before it is ingested, so files still being copied are not read half-written
+SETTLE_SECONDS = 1.0
+
+# File extensions picked up in the watched directory
+WATCHED_EXTENSIONS = ('.json', '.ndjson', '.jsonl', '.gz')
+
+# Accumulators kept by the daemon; SoH points would grow without bound, the report has SoH bands instead
+DAEMON_METRICS = [name for name in ACCUMULATORS if name != 'soh']
+
+# Model name of the SoH bands of the watched directory
+DAEMON_MODEL = 'fleet'
+
+STATE_FILE = 'state.json'
+KEYS_FILE = 'sessions.keys'
+REPORT_FILE = 'report.json'
+SESSIONS_DIR = 'sessions'
+
+class IngestStore:
+    """Normalized sessions and aggregates of all files ingested so far, persisted in store_dir.
+
+    - sessions/: the new sessions of every ingested file as Parquet parts
+    - sessions.keys: keys (bmwtools.ingest.session_key) of all stored sessions, one per line
+    - state.json: ingested files by SHA256, accumulator states and SoH sketches
+    - report.json: the statistics of all stored sessions
+
+    Sessions already stored are skipped, so overlapping exports of the same
+    vehicle are counted once. Aggregates are updated with the new sessions
+    only, the work per file does not grow with the size of the store.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        os.makedirs(os.path.join(store_dir, SESSIONS_DIR), exist_ok=True)
+        self._load()
+
+    def _load(self):
+        state_path = os.path.join(self.store_dir, STATE_FILE)
+        state = {}
+        if os.path.exists(state_path):
+            with open(state_path, 'r') as f:
+                state = jsonio.load(f)
+        self.files = state.get('files', {})
+        self.accumulators = {
+            name: ACCUMULATORS[name].from_state(state['accumulators'][name]) if name in state.get('accumulators', {}) else ACCUMULATORS[name]()
+            for name in DAEMON_METRICS
+        }
+        self.soh = FleetSohAggregator.from_state(state['soh_sketches']) if 'soh_sketches' in state else FleetSohAggregator()
+        self.keys_size = state.get('keys_size', 0)
+        self.seen = self._load_keys()
+
+    def _load_keys(self):
+        keys_path = os.path.join(self.store_dir, KEYS_FILE)
+        if not os.path.exists(keys_path):
+            open(keys_path, 'w').close()
+        # Keys appended by an ingest that did not finish are dropped, the file is ingested again
+        with open(keys_path, 'r+') as f:
+            f.truncate(self.keys_size)
+            return set(f.read().split())
+
+    def _save_state(self):
+        write_json(os.path.join(self.store_dir, STATE_FILE), {
+            'files': self.files,
+            'accumulators': {name: accumulator.state() for name, accumulator in self.accumulators.items()},
+            'soh_sketches': self.soh.state(),
+            'keys_size': self.keys_size
+        })
+
+    def report(self):
+        report = build_report(self.accumulators)
+        report['soh_bands'] = self.soh.bands()
+        report['sessions'] = len(self.seen)
+        report['files'] = len(self.files)
+        return report
+
+    def ingest_file(self, file_path, digest):
+        """Store the unseen sessions of an export or archive and add them to the aggregates, returning their number."""
+        new_keys = []
+        parts = []
+        try:
+            with open_archive(file_path) as f:
+                for number, (sessions, using_estimated_values) in enumerate(iter_processed_chunks(f)):
+                    new_sessions = []
+                    for session in sessions:
+                        key = session_key(session)
+                        if key not in self.seen:
+                            self.seen.add(key)
+                            new_keys.append(key)
+                            new_sessions.append(session)
+                    if not new_sessions:
+                        continue
+                    part_path = os.path.join(SESSIONS_DIR, f"{digest[:16]}-{number}.parquet")
+                    write_sessions(new_sessions, os.path.join(self.store_dir, part_path), using_estimated_values)
+                    parts.append(part_path)
+                    accumulate(new_sessions, self.accumulators)
+                    self.soh.add_sessions(new_sessions, DAEMON_MODEL)
+        except Exception:
+            # A file failing in a later chunk leaves neither sessions nor aggregates behind
+            for part_path in parts:
+                os.remove(os.path.join(self.store_dir, part_path))
+            self._load()
+            raise
+
+        with open(os.path.join(self.store_dir, KEYS_FILE), 'a') as f:
+            f.write(''.join(f"{key}\n" for key in new_keys))
+            f.flush()
+            self.keys_size = f.tell()
+        self.files[digest] = {'file': file_path, 'sessions': len(new_keys), 'parts': parts}
+        self._save_state()
+        write_json(os.path.join(self.store_dir, REPORT_FILE), self.report())
+        return len(new_keys)
+
+def find_files(directory):
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.lower().endswith(WATCHED_EXTENSIONS):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+class DirectoryWatcher:
+    """Finds files of a directory that were added or changed since the last scan, by size and modification time.
+
+    Only those files are hashed, so a scan costs one stat per file.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.fingerprints = {}
+
+    def changed_files(self):
+        now = time.time()
+        changed = []
+        for file_path in find_files(self.directory):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime < SETTLE_SECONDS:
+                continue
+            fingerprint = (stat.st_size, stat.st_mtime_ns)
+            if self.fingerprints.get(file_path) != fingerprint:
+                self.fingerprints[file_path] = fingerprint
+                changed.append(file_path)
+        return changed
+
+def ingest_changes(store, watcher):
+    """Ingest the files of the watched directory with unseen content, returning the number of new sessions."""
+    new_sessions = 0
+    for file_path in watcher.changed_files():
+        try:
+            digest = file_sha256(file_path)
+            if digest in store.files:
+                continue
+            count = store.ingest_file(file_path, digest)
+        except (OSError, ValueError, TypeError) as e:
+            # Retried when the file changes again
+            print(f"Skipping {file_path}: {e}", file=sys.stderr)
+            continue
+        print(f"Ingested {count} new sessions from {file_path}", file=sys.stderr)
+        new_sessions += count
+    return new_sessions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Watch a directory for BMW CarData exports and keep a store of their sessions and statistics up to date.')
+    parser.add_argument('watch_dir', help='Directory scanned recursively for exports and NDJSON archives')
+    parser.add_argument('store_dir', help='Directory for the normalized sessions, state and report.json')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='Seconds between two scans')
+    parser.add_argument('--once', action='store_true', help='Ingest the current files and exit')
+    args = parser.parse_args(argv)
+
+    store = IngestStore(args.store_dir)
+    watcher = DirectoryWatcher(args.watch_dir)
+    write_json(os.path.join(args.store_dir, REPORT_FILE), store.report())
+    try:
+        while True:
+            ingest_changes(store, watcher)
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
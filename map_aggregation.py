@@ -0,0 +1,153 @@
+import folium
+import numpy as np
+import branca.colormap
+from bmwtools.columns import SessionColumns
+
+# Geohash precisions of the precomputed grids, from about 156 km to 1.2 km cell width
+GEOHASH_PRECISIONS = (3, 4, 5, 6)
+
+# Maximum number of cells drawn on the aggregated map
+MAX_MAP_CELLS = 400
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def geohash_encode(latitude, longitude, precision):
+    """Geohash of a coordinate with the given number of characters."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        # Even bits split the longitude, odd bits the latitude
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+def geohash_bounds(geohash):
+    """Bounds (south, west, north, east) of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+class LocationGrid:
+    """Sessions binned into geohash cells at several precisions, built once per dataset.
+
+    Every session gets a cell code per precision (-1 without coordinates).
+    Statistics of a range of sessions are then bincounts over these codes,
+    so the cost of a map depends on the number of cells, not on the number
+    of sessions or distinct locations. Sessions must be ordered like
+    AggregateIndex.sessions for its (lo, hi) ranges to apply, whose columns
+    (AggregateIndex.columns) are then reused.
+    """
+
+    def __init__(self, sessions, precisions=GEOHASH_PRECISIONS, columns=None):
+        if columns is None:
+            columns = SessionColumns(sessions)
+        self.precisions = precisions
+        self.failed = np.array(columns['failed'], dtype=bool)
+        self.energy = np.array(columns['energy_added_hvb'], dtype=float)
+        self.cells = {}
+        self.codes = {}
+        for precision in precisions:
+            cells = {}
+            codes = np.full(len(sessions), -1, dtype=np.int64)
+            for position, session in enumerate(sessions):
+                if session['latitude'] and session['longitude']:
+                    cell = geohash_encode(session['latitude'], session['longitude'], precision)
+                    codes[position] = cells.setdefault(cell, len(cells))
+            self.cells[precision] = list(cells)
+            self.codes[precision] = codes
+
+    def cell_stats(self, precision, lo=0, hi=None):
+        """Visits, failed visits and energy added per cell for the sessions in [lo, hi)."""
+        codes = self.codes[precision][lo:hi]
+        located = codes >= 0
+        codes = codes[located]
+        size = len(self.cells[precision])
+        visits = np.bincount(codes, minlength=size)
+        failed = np.bincount(codes, weights=self.failed[lo:hi][located], minlength=size)
+        energy = np.bincount(codes, weights=self.energy[lo:hi][located], minlength=size)
+        return [
+            {'cell': self.cells[precision][code], 'visits': int(visits[code]), 'failure_rate': float(failed[code] / visits[code]), 'energy': float(energy[code])}
+            for code in np.flatnonzero(visits)
+        ]
+
+    def select_precision(self, lo=0, hi=None, max_cells=MAX_MAP_CELLS):
+        """Finest precision with at most max_cells occupied cells in [lo, hi)."""
+        selected = self.precisions[0]
+        for precision in self.precisions:
+            codes = self.codes[precision][lo:hi]
+            if len(np.unique(codes[codes >= 0])) > max_cells:
+                break
+            selected = precision
+        return selected
+
+def create_aggregated_map(grid, lo=0, hi=None, max_cells=MAX_MAP_CELLS):
+    """Create a map with one choropleth layer of visits per geohash cell and return it as HTML string."""
+    precision = grid.select_precision(lo, hi, max_cells)
+    stats = grid.cell_stats(precision, lo, hi)
+    if not stats:
+        return ""
+
+    features = []
+    for cell in stats:
+        south, west, north, east = geohash_bounds(cell['cell'])
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Polygon', 'coordinates': [[[west, south], [east, south], [east, north], [west, north], [west, south]]]},
+            'properties': {
+                'visits': cell['visits'],
+                'failure_rate': f"{cell['failure_rate'] * 100:.0f}%",
+                'energy': f"{cell['energy']:.1f} kWh"
+            }
+        })
+
+    # Center on the busiest cell
+    busiest = max(stats, key=lambda cell: cell['visits'])
+    south, west, north, east = geohash_bounds(busiest['cell'])
+    charging_map = folium.Map(
+        location=[(south + north) / 2, (west + east) / 2],
+        zoom_start=5,
+        tiles="https://tiles.ext.ffmuc.net/osm/{z}/{x}/{y}.png",
+        attr='Map data © OpenStreetMap contributors, Tiles © FFMUC'
+    )
+    colormap = branca.colormap.linear.YlOrRd_09.scale(1, max(busiest['visits'], 2))
+    colormap.caption = 'Charging sessions'
+    folium.GeoJson(
+        {'type': 'FeatureCollection', 'features': features},
+        name='Charging sessions',
+        style_function=lambda feature: {
+            'fillColor': colormap(feature['properties']['visits']),
+            'color': 'grey',
+            'weight': 1,
+            'fillOpacity': 0.6
+        },
+        tooltip=folium.GeoJsonTooltip(fields=['visits', 'failure_rate', 'energy'], aliases=['Sessions', 'Failure rate', 'Energy added'])
+    ).add_to(charging_map)
+    colormap.add_to(charging_map)
+    return charging_map._repr_html_()
@@ -0,0 +1,69 @@
+"""Callback outputs a client already shows are answered with no_update instead of being sent again."""
+import hashlib
+import threading
+from collections import OrderedDict
+from dash import no_update
+from plotly.io.json import to_json_plotly
+
+# Number of (client, output) hashes kept in memory when no disk cache is used
+MAX_SENT = 4096
+
+# Seconds the hash of an output sent to a client is kept in the disk cache
+SENT_EXPIRE_SECONDS = 24 * 60 * 60
+
+_sent = OrderedDict()
+_lock = threading.Lock()
+_disk_cache = None
+
+def use_disk_cache(cache):
+    """Keep the hashes in a diskcache.Cache, so outputs of background jobs and the server process are diffed together."""
+    global _disk_cache
+    _disk_cache = cache
+
+def content_hash(value):
+    """Hash of an output value as Dash serializes it."""
+    return hashlib.blake2b(to_json_plotly(value).encode(), digest_size=16).hexdigest()
+
+def _get_sent(key):
+    if _disk_cache is not None:
+        return _disk_cache.get(f"sent:{key}")
+    with _lock:
+        return _sent.get(key)
+
+def _set_sent(key, digest):
+    if _disk_cache is not None:
+        _disk_cache.set(f"sent:{key}", digest, expire=SENT_EXPIRE_SECONDS)
+        return
+    with _lock:
+        _sent[key] = digest
+        _sent.move_to_end(key)
+        while len(_sent) > MAX_SENT:
+            _sent.popitem(last=False)
+
+def skip_unchanged(client_id, outputs, values, shown_id=None):
+    """Replace every value the client was last sent for the same output by no_update.
+
+    outputs are the output names (e.g. 'overview-scatterplot.figure') aligned
+    with values, None marks an output that is always sent because the browser
+    changes it itself. Without client_id all values are sent.
+
+    The values are compared with the hashes recorded under shown_id (default
+    client_id) and recorded under client_id. A response that may never reach
+    the client, like the one of a cancelled or superseded background job,
+    is recorded under a new id that the client only passes back as shown_id
+    once it received the response.
+    """
+    if not client_id:
+        return values
+    shown_id = shown_id or client_id
+    result = []
+    for output, value in zip(outputs, values):
+        if output is None or value is no_update:
+            result.append(value)
+            continue
+        digest = content_hash(value)
+        unchanged = _get_sent(f"{shown_id}:{output}") == digest
+        if not unchanged or shown_id != client_id:
+            _set_sent(f"{client_id}:{output}", digest)
+        result.append(no_update if unchanged else value)
+    return result
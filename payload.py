@@ -0,0 +1,119 @@
+"""Smaller callback responses: numbers rounded per unit, typed arrays, templates without unused parts and a size budget."""
+import base64
+import logging
+import os
+import zlib
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+logger = logging.getLogger(__name__)
+
+# Decimals the numbers of each unit are rounded to before they are sent to the browser
+UNIT_DECIMALS = {'kW': 1, 'kWh': 2, '%': 1, 'km': 0}
+
+# Numeric trace arrays with at least this many values are sent as plotly typed arrays (dtype + base64 bdata)
+TYPED_ARRAY_MIN_LENGTH = 64
+
+# Bytes of JSON a callback response may have after optimization, larger responses are logged as warnings
+RESPONSE_BUDGET_BYTES = int(os.environ.get('BMWTOOLS_RESPONSE_BUDGET_BYTES', 512 * 1024))
+
+# Trace properties holding numeric arrays
+_ARRAY_PROPERTIES = ('x', 'y')
+
+# Template layout parts that only apply to subplots of these types, which the dashboard figures never have
+_SUBPLOT_LAYOUT_KEYS = ('geo', 'mapbox', 'polar', 'ternary', 'scene')
+
+# Smallest integer types of plotly typed arrays, tried in this order
+_INTEGER_DTYPES = ('u1', 'i1', 'u2', 'i2', 'u4', 'i4')
+
+def quantize(values, unit):
+    """Round a number, a list of numbers or a numpy array to the decimals of unit."""
+    decimals = UNIT_DECIMALS[unit]
+    if isinstance(values, np.ndarray):
+        return np.round(values.astype(float), decimals)
+    if isinstance(values, (list, tuple)):
+        return [round(value, decimals) for value in values]
+    return round(values, decimals)
+
+def typed_array(values):
+    """Plotly typed array of a numeric array: the smallest integer type that holds integral values, float32 otherwise.
+
+    plotly.js has no 64 bit integer arrays, integral values beyond int32 are sent as float64.
+    """
+    values = np.asarray(values, dtype=float)
+    if np.isfinite(values).all() and np.array_equal(values, np.round(values)):
+        for dtype in _INTEGER_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= values.min() and values.max() <= info.max:
+                break
+        else:
+            dtype = 'f8'
+    else:
+        dtype = 'f4'
+    return {'dtype': dtype, 'bdata': base64.b64encode(values.astype(f"<{dtype}").tobytes()).decode('ascii')}
+
+def _is_numeric_array(values):
+    if isinstance(values, np.ndarray):
+        return values.dtype.kind in 'iuf'
+    return isinstance(values, (list, tuple)) and all(
+        isinstance(value, (int, float)) and not isinstance(value, bool) for value in values
+    )
+
+def _strip_template(template, trace_types):
+    template = dict(template)
+    if 'data' in template:
+        template['data'] = {trace_type: defaults for trace_type, defaults in template['data'].items() if trace_type in trace_types}
+    if 'layout' in template:
+        template['layout'] = {key: value for key, value in template['layout'].items() if key not in _SUBPLOT_LAYOUT_KEYS}
+    return template
+
+def optimize_figure(spec):
+    """Copy of a figure spec with large numeric arrays as typed arrays and only the template parts the figure uses.
+
+    The template defaults of trace types the figure has no trace of and of
+    subplot types it does not have are dropped, which looks the same.
+    """
+    data = []
+    for trace in spec.get('data', []):
+        trace = dict(trace)
+        for name in _ARRAY_PROPERTIES:
+            values = trace.get(name)
+            if values is not None and len(values) >= TYPED_ARRAY_MIN_LENGTH and _is_numeric_array(values):
+                trace[name] = typed_array(values)
+        data.append(trace)
+
+    layout = dict(spec.get('layout', {}))
+    if 'template' in layout:
+        layout['template'] = _strip_template(layout['template'], {trace.get('type', 'scatter') for trace in data})
+    return dict(spec, data=data, layout=layout)
+
+def is_figure(value):
+    return isinstance(value, dict) and 'data' in value and 'layout' in value
+
+def optimize_outputs(values):
+    """Callback output values with every figure spec optimized."""
+    return [optimize_figure(value) if is_figure(value) else value for value in values]
+
+def response_size(values):
+    """Bytes of the JSON of callback output values and of its gzip compression."""
+    payload = to_json_plotly(list(values)).encode()
+    return len(payload), len(zlib.compress(payload))
+
+def check_budget(name, before, after):
+    """Log the size of a callback response before and after optimization, as warning when it exceeds the budget.
+
+    Sizes are only measured for enabled log levels: without INFO messages
+    only the optimized response is serialized, to warn about the budget.
+    """
+    if logger.isEnabledFor(logging.INFO):
+        (before_bytes, before_gzip), (after_bytes, after_gzip) = response_size(before), response_size(after)
+        message = f"{name}: {before_bytes} -> {after_bytes} bytes, {before_gzip} -> {after_gzip} bytes gzipped"
+    elif logger.isEnabledFor(logging.WARNING):
+        after_bytes = len(to_json_plotly(list(after)).encode())
+        message = f"{name}: {after_bytes} bytes"
+    else:
+        return
+    if after_bytes > RESPONSE_BUDGET_BYTES:
+        logger.warning(f"{message}, over the budget of {RESPONSE_BUDGET_BYTES} bytes")
+    else:
+        logger.info(message)
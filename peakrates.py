@@ -1,10 +1,10 @@
-import json
+from bmwtools import jsonio
 import pandas as pd
 import plotly.express as px
 
 # Load the JSON file
 with open('path_to_your_json_file.json', 'r') as file:
-    data = json.load(file)
+    data = jsonio.load(file)
 
 # Extract the highest charging rate (above 180 kW) for each session and the corresponding date
 charge_dates = []
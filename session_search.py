@@ -0,0 +1,71 @@
+import bisect
+import re
+
+# Number of sessions returned per search
+SEARCH_PAGE_SIZE = 50
+
+_TOKEN_SEPARATORS = re.compile(r'[\s,;/()]+')
+
+# Function to create the dropdown label of a session
+def session_label(session):
+    return f"{session['start_time'].strftime('%Y-%m-%d %H:%M')} - {session['location']}"
+
+def session_tokens(session):
+    """Search tokens of a session: its start date, month, year and time and the words of its location."""
+    start_time = session['start_time']
+    tokens = {
+        start_time.strftime('%Y-%m-%d'),
+        start_time.strftime('%Y-%m'),
+        start_time.strftime('%Y'),
+        start_time.strftime('%H:%M'),
+    }
+    tokens.update(token for token in _TOKEN_SEPARATORS.split(session['location'].lower()) if token)
+    return tokens
+
+class SessionSearchIndex:
+    """Inverted index from search tokens to session positions, built once per dataset.
+
+    Sessions must be ordered like AggregateIndex.sessions. Every word of a
+    query matches the tokens it is a prefix of, found by bisecting the
+    sorted token list, and a session matches when it matches every word.
+    Only one page of labels is created per search.
+    """
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        postings = {}
+        for position, session in enumerate(sessions):
+            for token in session_tokens(session):
+                postings.setdefault(token, []).append(position)
+        self.tokens = sorted(postings)
+        self.postings = [postings[token] for token in self.tokens]
+
+    def _prefix_matches(self, word, lo, hi):
+        first = bisect.bisect_left(self.tokens, word)
+        last = bisect.bisect_left(self.tokens, word + '\uffff')
+        matches = set()
+        for positions in self.postings[first:last]:
+            matches.update(positions[bisect.bisect_left(positions, lo):bisect.bisect_left(positions, hi)])
+        return matches
+
+    def search(self, query, lo=0, hi=None, limit=SEARCH_PAGE_SIZE):
+        """Positions in [lo, hi) of the first sessions matching every word of query, all sessions for an empty query."""
+        hi = len(self.sessions) if hi is None else hi
+        words = [word for word in _TOKEN_SEPARATORS.split((query or '').lower()) if word]
+        if not words:
+            return list(range(lo, min(hi, lo + limit)))
+        # Intersect starting with the most selective word
+        matches = sorted((self._prefix_matches(word, lo, hi) for word in words), key=len)
+        positions = matches[0].intersection(*matches[1:])
+        return sorted(positions)[:limit]
+
+    def options(self, query, lo=0, hi=None, selected=None, limit=SEARCH_PAGE_SIZE):
+        """Dropdown options for a search, with values relative to lo like the session-data store.
+
+        The selected session is always included, so the dropdown keeps showing it.
+        """
+        hi = len(self.sessions) if hi is None else hi
+        positions = self.search(query, lo, hi, limit)
+        if selected is not None and lo + selected < hi and lo + selected not in positions:
+            positions.insert(0, lo + selected)
+        return [{'label': session_label(self.sessions[position]), 'value': position - lo} for position in positions]
@@ -0,0 +1,52 @@
+import math
+
+# Sessions within this distance (km) of a site's first session belong to the site, like draw_chargers.find_close_location
+SITE_RADIUS_KM = 0.10
+
+EARTH_RADIUS_KM = 6371.0088
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two coordinates in km."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def _grid_cell(latitude, longitude, radius_km):
+    # Approximate planar position in km, so neighbouring sites are at most one cell away
+    y = latitude * 110.574
+    x = longitude * 111.320 * math.cos(math.radians(latitude))
+    return int(x // radius_km), int(y // radius_km)
+
+def assign_sites(sessions, radius_km=SITE_RADIUS_KM):
+    """Cluster the charging locations of a dataset into sites and set 'site_id' on every session.
+
+    Sessions are visited in start time order. A session joins the first
+    site whose first session is within radius_km, otherwise it starts a new
+    site. A grid of radius_km cells indexes the sites, so only the sites of
+    the 3x3 neighbouring cells are compared. Site ids number the sites in
+    order of their first session and sessions without coordinates get None.
+    Returns the sites as dicts with site_id, latitude, longitude and location.
+    """
+    sites = []
+    grid = {}
+    for session in sorted(sessions, key=lambda s: s['start_time']):
+        latitude = session['latitude']
+        longitude = session['longitude']
+        if not (latitude and longitude):
+            session['site_id'] = None
+            continue
+        x, y = _grid_cell(latitude, longitude, radius_km)
+        site_id = None
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for candidate in grid.get((x + dx, y + dy), ()):
+                    site = sites[candidate]
+                    if haversine_km(latitude, longitude, site['latitude'], site['longitude']) < radius_km:
+                        if site_id is None or candidate < site_id:
+                            site_id = candidate
+        if site_id is None:
+            site_id = len(sites)
+            sites.append({'site_id': site_id, 'latitude': latitude, 'longitude': longitude, 'location': session['location']})
+            grid.setdefault((x, y), []).append(site_id)
+        session['site_id'] = site_id
+    return sites
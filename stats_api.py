@@ -0,0 +1,162 @@
+"""JSON API with the statistics of the dashboard, without rendering any figure or map.
+
+POST /api/stats takes a CarData export as request body (or as multipart
+file field 'file'), GET /api/stats/<dataset> a dataset handle returned by an
+earlier request or created by a dashboard upload. Both accept the optional
+query parameters start_date and end_date (ISO 8601) like the date picker;
+a range with only one of them is open on the other side.
+GET /api/providers/<dataset> answers slices and roll-ups of the provider
+cube (bmwtools.provider_cube) of a dataset: group_by takes comma separated
+dimensions, provider, month, charge_type and success filter on comma
+separated values. Only the headless bmwtools package and AggregateIndex are
+used, plotly and folium are never imported.
+"""
+import datetime
+import json
+from flask import Blueprint, Response, request
+from bmwtools import jsonio
+from bmwtools.sessions import process_data, calculate_estimated_battery_capacity
+from bmwtools.provider_cube import DIMENSIONS, ProviderCube
+from aggregate_index import AggregateIndex
+from dataset_cache import dataset_key, result_key, get_result, put_result
+
+# Name of the cached results holding the index of a dataset for the API
+STATS_RESULT = 'stats'
+
+stats_api = Blueprint('stats_api', __name__, url_prefix='/api')
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+# Function to cache the index and provider cube of a dataset, which the API answers from without the dashboard's map and figure data
+def put_stats_dataset(key, index, using_estimated_values):
+    return put_result(result_key(key, STATS_RESULT), {
+        'index': index,
+        'cube': ProviderCube(index.normalizer).add_sessions(index.sessions),
+        'using_estimated_values': using_estimated_values
+    })
+
+def get_stats_dataset(key):
+    return get_result(result_key(key, STATS_RESULT))
+
+def _json_response(body, status=200):
+    return Response(jsonio.dumps(body), status=status, mimetype='application/json')
+
+@stats_api.errorhandler(ApiError)
+def handle_api_error(error):
+    return _json_response({'error': str(error)}, error.status)
+
+# Function to parse an ISO 8601 date, with a time zone converted to naive local time like the session start times
+def _local_datetime(value):
+    date = datetime.datetime.fromisoformat(value)
+    if date.tzinfo is not None:
+        date = date.astimezone().replace(tzinfo=None)
+    return date
+
+def _date_range():
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_date = _local_datetime(start_date) if start_date else None
+        end_date = _local_datetime(end_date) if end_date else None
+    except ValueError as e:
+        raise ApiError(f"Invalid date: {e}")
+    return start_date, end_date
+
+def compute_stats(index, lo, hi):
+    """Statistics of the sessions in [lo, hi) of an AggregateIndex, as shown by the dashboard."""
+    summary = index.summary(lo, hi)
+    session_stats = index.session_stats(lo, hi)
+    return {
+        'sessions': {
+            'total': summary.total_sessions,
+            'failed': summary.failed_sessions,
+            'successful': summary.successful_sessions
+        },
+        'energy': {
+            'ac_energy_added': summary.ac_energy_added,
+            'dc_energy_added': summary.dc_energy_added,
+            'energy_added': summary.energy_added,
+            'energy_from_grid': summary.energy_from_grid
+        },
+        'mileage': {'min': summary.mileage_min, 'max': summary.mileage_max, 'distance': summary.distance},
+        'overall_efficiency': summary.overall_efficiency,
+        'power_consumption_per_100km': summary.power_consumption_per_100km,
+        'power_consumption_per_100km_without_grid_losses': summary.power_consumption_per_100km_without_grid_losses,
+        'soc_statistics': summary.soc_statistics(),
+        'providers': {
+            'top_failed': [{'provider': provider, 'sessions': count} for provider, count in session_stats['top_failed_providers']],
+            'top_successful': [{'provider': provider, 'sessions': count} for provider, count in session_stats['top_successful_providers']]
+        },
+        'soh': [
+            dict(point, date=point['date'].isoformat())
+            for point in calculate_estimated_battery_capacity(index.sessions_in_range(lo, hi))
+        ]
+    }
+
+def _cube_query():
+    group_by = [dimension for dimension in request.args.get('group_by', 'provider').split(',') if dimension]
+    filters = {}
+    for dimension in DIMENSIONS:
+        value = request.args.get(dimension)
+        if value is None:
+            continue
+        values = value.split(',')
+        if dimension == 'success':
+            if any(v not in ('true', 'false') for v in values):
+                raise ApiError("success must be true or false")
+            values = [v == 'true' for v in values]
+        filters[dimension] = values
+    return group_by, filters
+
+def _stats_response(key, dataset):
+    start_date, end_date = _date_range()
+    index = dataset['index']
+    lo, hi = index.range(start_date, end_date)
+    return _json_response(dict(
+        compute_stats(index, lo, hi),
+        dataset=key,
+        start_date=start_date.isoformat() if start_date else None,
+        end_date=end_date.isoformat() if end_date else None,
+        using_estimated_values=dataset['using_estimated_values']
+    ))
+
+@stats_api.route('/stats', methods=['POST'])
+def stats_of_upload():
+    upload = request.files.get('file')
+    content = upload.read() if upload else request.get_data()
+    if not content:
+        raise ApiError("Expected a CarData export as request body or as file field 'file'")
+
+    key = dataset_key(content)
+    dataset = get_stats_dataset(key)
+    if dataset is None:
+        try:
+            sessions, using_estimated_values = process_data(jsonio.loads(content))
+        except json.JSONDecodeError as e:
+            raise ApiError(f"Invalid JSON: {e}")
+        except (KeyError, TypeError, AttributeError, IndexError) as e:
+            raise ApiError(f"Not a CarData export: {e!r}")
+        dataset = put_stats_dataset(key, AggregateIndex(sessions), using_estimated_values)
+    return _stats_response(key, dataset)
+
+@stats_api.route('/stats/<key>', methods=['GET'])
+def stats_of_dataset(key):
+    dataset = get_stats_dataset(key)
+    if dataset is None:
+        raise ApiError(f"Unknown or expired dataset {key}, upload it again with POST /api/stats", 404)
+    return _stats_response(key, dataset)
+
+@stats_api.route('/providers/<key>', methods=['GET'])
+def providers_of_dataset(key):
+    dataset = get_stats_dataset(key)
+    if dataset is None:
+        raise ApiError(f"Unknown or expired dataset {key}, upload it again with POST /api/stats", 404)
+    group_by, filters = _cube_query()
+    try:
+        rows = dataset['cube'].rows(group_by, **filters)
+    except ValueError as e:
+        raise ApiError(str(e))
+    return _json_response({'dataset': key, 'group_by': group_by, 'rows': rows})
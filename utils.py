@@ -1,8 +1,6 @@
 import hashlib
-import datetime
-import plotly.graph_objs as go
-import pandas as pd
-from folium import Map, Marker
+from figure_specs import figure, scatter, indicator
+from dataset_cache import DISK_EXPIRE_SECONDS
 import os
 
 # Function to calculate the sha256sum of a file
@@ -29,106 +27,27 @@ def get_disclaimer_with_hash():
     sha256_hashes = get_all_files_sha256(os.path.dirname(__file__))
     sorted_hashes = sorted(sha256_hashes.items())  # Sort by file name alphabetically
     hash_lines = "\n".join([f"{file}: {hash}" for file, hash in sorted_hashes])
-    return ('Disclaimer: This application stores all uploaded data in memory, if you refresh your session is lost.\n' 
+    return ('Disclaimer: Uploaded files are not stored. The charging sessions derived from them are kept in memory and in a temporary '
+            f"cache on the server for up to {DISK_EXPIRE_SECONDS // 60} minutes; if you refresh your session is lost.\n"
             'CarData contains location data of your charges. Use at your own risk!\n'
             f"SHA256 of the files:\n{hash_lines}\n" 
             'You can verify authenticity at https://github.com/awlx/bmwtools')
 
-# Function to process JSON data
-def process_data(data):
-    sessions = []
-    using_estimated_values = False
-    for session in data:
-        try:
-            start_time = datetime.datetime.fromtimestamp(session['startTime'])
-            end_time = datetime.datetime.fromtimestamp(session['endTime'])
-            soc_start = session['displayedStartSoc']
-            soc_end = session['displayedSoc']
-            energy_from_grid = session['energyConsumedFromPowerGridKwh']
-            cost = session.get('chargingCostInformation', {}).get('calculatedChargingCost', 0)
-            
-            # Check if energyIncreaseHvbKwh exists in the data
-            energy_increase_hvb = session.get('energyIncreaseHvbKwh')
-            if energy_increase_hvb is None:
-                # Determine if it's DC or AC charging based on average power
-                # Calculate average power first
-                avg_power = sum([block.get('averagePowerGridKw', 0) for block in session.get('chargingBlocks', [])]) / max(len(session.get('chargingBlocks', [])), 1)
-                
-                # Use different efficiency estimates based on charging type
-                if avg_power >= 12:  # DC charging (typically >= 12kW)
-                    energy_increase_hvb = energy_from_grid * 0.98  # 98% efficiency for DC
-                else:  # AC charging
-                    energy_increase_hvb = energy_from_grid * 0.92  # 92% efficiency for AC
-                using_estimated_values = True
-            
-            efficiency = energy_increase_hvb / energy_from_grid if energy_from_grid else 0
-            location = session.get('chargingLocation', {}).get('formattedAddress', 'Unknown Location')
-            latitude = session.get('chargingLocation', {}).get('mapMatchedLatitude', 0)
-            longitude = session.get('chargingLocation', {}).get('mapMatchedLongitude', 0)
-            avg_power = sum([block.get('averagePowerGridKw', 0) for block in session.get('chargingBlocks', [])]) / max(len(session.get('chargingBlocks', [])), 1)
-            grid_power_start = [block.get('averagePowerGridKw', 0) for block in session.get('chargingBlocks', [])]
-            mileage = session.get('mileage', 0)
-            session_time_minutes = (end_time - start_time).total_seconds() / 60
-            provider = session.get('publicChargingPoint', {}).get('potentialChargingPointMatches', [{}])[0].get('providerName', 'Unknown')
-
-            sessions.append({
-                'start_time': start_time,
-                'end_time': end_time,
-                'soc_start': soc_start,
-                'soc_end': soc_end,
-                'energy_from_grid': energy_from_grid,
-                'energy_added_hvb': energy_increase_hvb,
-                'cost': cost,
-                'efficiency': efficiency,
-                'location': location,
-                'latitude': latitude,
-                'longitude': longitude,
-                'avg_power': avg_power,
-                'grid_power_start': grid_power_start,
-                'mileage': mileage,
-                'session_time_minutes': session_time_minutes,
-                'provider': provider,  # Add provider name
-                'using_estimated_energy': energy_increase_hvb != session.get('energyIncreaseHvbKwh')
-            })
-        except KeyError:
-            continue
-    return sessions, using_estimated_values
-
-# Function to calculate estimated battery capacity (SoH)
-def calculate_estimated_battery_capacity(sessions):
-    estimated_battery_capacity = []
-    for session in sessions:
-        if session['energy_added_hvb'] >= 30:
-            soc_change = session['soc_end'] - session['soc_start']
-            if soc_change != 0:
-                estimated_capacity = (session['energy_added_hvb'] * 100) / soc_change
-            else:
-                estimated_capacity = 0
-            estimated_battery_capacity.append({
-                'date': session['start_time'],
-                'estimated_battery_capacity': estimated_capacity,
-                'soc_change': soc_change
-            })
-    return estimated_battery_capacity
-
-# Function to calculate overall efficiency and power consumption
-def calculate_overall_stats(sessions):
-    total_energy_added = sum(s['energy_added_hvb'] for s in sessions)
-    total_energy_from_grid = sum(s['energy_from_grid'] for s in sessions)
-    if sessions:
-        total_distance = max(s['mileage'] for s in sessions) - min(s['mileage'] for s in sessions)
-    else:
-        total_distance = max(s['mileage'] for s in sessions) if sessions else 0
-    
-    overall_efficiency = (total_energy_added / total_energy_from_grid) if total_energy_from_grid else 0
-    power_consumption_per_100km = (total_energy_from_grid / total_distance) * 100 if total_distance else 0
-    power_consumption_per_100km_without_grid_losses = (total_energy_added / total_distance) * 100 if total_distance else 0
-    
-    return overall_efficiency, power_consumption_per_100km, power_consumption_per_100km_without_grid_losses
+# Session logic lives in the headless bmwtools package, re-exported here for the dashboard and scripts
+from bmwtools.sessions import (
+    DC_POWER_THRESHOLD_KW,
+    is_dc_session,
+    process_session,
+    iter_sessions_with_blocks,
+    iter_sessions,
+    process_data,
+    calculate_estimated_battery_capacity,
+    calculate_overall_stats
+)
 
 # Function to create a gauge trace
 def create_gauge_trace(value, title, color, domain_x, domain_y=[0, 1], range_max=None):
-    return go.Indicator(
+    return indicator(
         mode="gauge+number",
         value=value,
         title={'text': title, 'font': {'size': 14}},  # Adjust the font size here
@@ -138,15 +57,16 @@ def create_gauge_trace(value, title, color, domain_x, domain_y=[0, 1], range_max
 
 # Function to create a scatter plot with optional trend line and labels
 def create_scatter_plot(x, y, title, xaxis_title, yaxis_title, color='blue', mode='markers', size=10, trendline=False):
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
+    data = [scatter(
         x=x,
         y=y,
         mode=mode,
         marker=dict(size=size, color=color),
         name=title
-    ))
-    if trendline:
+    )]
+    # Without points there is nothing to draw a trend line through
+    if trendline and len(y) > 0:
+        import pandas as pd  # Visualization dependencies are imported on first use
         # Check if this is the SoH plot (battery capacity)
         if "Battery Capacity" in title or "SoH" in title:
             # For SoH plots, create a proper trend line by averaging groups of 10 points
@@ -222,7 +142,7 @@ def create_scatter_plot(x, y, title, xaxis_title, yaxis_title, color='blue', mod
             window_size = max(1, min(20, len(y)))  # Ensure window size is at least 1
             smoothed_values = pd.Series(y).rolling(window=window_size, min_periods=1).mean()
             
-        fig.add_trace(go.Scatter(
+        data.append(scatter(
             x=x,
             y=smoothed_values,
             mode='lines',
@@ -231,7 +151,7 @@ def create_scatter_plot(x, y, title, xaxis_title, yaxis_title, color='blue', mod
         ))
     # Add labels to the beginning and end of the graph
     if x and y:
-        fig.add_trace(go.Scatter(
+        data.append(scatter(
             x=[x[0], x[-1]],
             y=[y[0], y[-1]],
             mode='text',
@@ -239,16 +159,17 @@ def create_scatter_plot(x, y, title, xaxis_title, yaxis_title, color='blue', mod
             textposition='top center',
             showlegend=False  # Remove legend item for labels
         ))
-    fig.update_layout(
+    return figure(
+        data,
         title=title,
         xaxis_title=xaxis_title,
         yaxis_title=yaxis_title,
-        template='plotly_white'
+        template_name='plotly_white'
     )
-    return fig
 
 # Function to create a Folium map
 def create_folium_map(sessions, selected_session=None):
+    from folium import Map, Marker
     if selected_session:
         zoom_level = 13
         center = [selected_session['latitude'], selected_session['longitude']]
@@ -261,3 +182,15 @@ def create_folium_map(sessions, selected_session=None):
         Marker([session['latitude'], session['longitude']], popup=session['location']).add_to(m)
     map_html = m._repr_html_()
     return map_html
+
+# Placeholder map center, replaced with the selected session's location by the clientside callback
+MAP_CENTER_PLACEHOLDER = (-89.123456, -179.654321)
+
+# Function to create a Folium map of all sessions, to be centered on a session in the browser
+# With the sites of sites.assign_sites there is one marker per visited site instead of one per session
+def create_folium_map_template(sessions, sites=None):
+    placeholder_session = {'latitude': MAP_CENTER_PLACEHOLDER[0], 'longitude': MAP_CENTER_PLACEHOLDER[1]}
+    if sites is not None:
+        site_ids = dict.fromkeys(s['site_id'] for s in sessions if s.get('site_id') is not None)
+        return create_folium_map([sites[site_id] for site_id in site_ids], placeholder_session)
+    return create_folium_map(sessions, placeholder_session)
@@ -0,0 +1,127 @@
+import base64
+import datetime
+import zlib
+from bmwtools import jsonio
+
+# Version of the encoding, decode_sessions rejects payloads of other versions
+WIRE_FORMAT_VERSION = 2
+
+# Grid power is sent as integer multiples of 0.01 kW, the resolution of averagePowerGridKw in CarData
+POWER_SCALE = 100
+
+def to_epoch(value):
+    """Seconds since the epoch of a naive datetime, interpreting its wall-clock time as UTC.
+
+    process_data produces naive local datetimes. Treating them as UTC keeps
+    the wall-clock time exact in both directions and independent of the
+    timezone of whoever decodes the payload.
+    """
+    return int(value.replace(tzinfo=datetime.timezone.utc).timestamp())
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+def from_epoch(value):
+    return _EPOCH + datetime.timedelta(seconds=value)
+
+def _dictionary_encode(values):
+    """Encode repeated strings as a list of distinct values and one index per row."""
+    indices = {}
+    codes = [indices.setdefault(value, len(indices)) for value in values]
+    return list(indices), codes
+
+def encode_sessions(sessions, compress=False):
+    """Encode normalized sessions into a compact, versioned and JSON compatible payload.
+
+    Sessions are stored column by column with short keys: times as epoch
+    seconds, locations and providers dictionary encoded and the grid power of
+    all charging blocks as one flat list of quantized integers plus an offset
+    per session, with the start and end of every block in seconds from the
+    start of its session (null without block times). Columns that can be derived (efficiency, average power and
+    session time) are recomputed by decode_sessions. With compress=True the
+    payload is deflated and base64 encoded into a single string.
+    """
+    locations, location_codes = _dictionary_encode(s['location'] for s in sessions)
+    providers, provider_codes = _dictionary_encode(s['provider'] for s in sessions)
+    offsets = [0]
+    power = []
+    block_starts = []
+    block_ends = []
+    for s in sessions:
+        power.extend(round(p * POWER_SCALE) for p in s['grid_power_start'])
+        block_offsets = s.get('block_offsets') or [None] * len(s['grid_power_start'])
+        block_starts.extend(block[0] if block else None for block in block_offsets)
+        block_ends.extend(block[1] if block else None for block in block_offsets)
+        offsets.append(len(power))
+
+    payload = {
+        'v': WIRE_FORMAT_VERSION,
+        'ts': [to_epoch(s['start_time']) for s in sessions],
+        'te': [to_epoch(s['end_time']) for s in sessions],
+        'ss': [s['soc_start'] for s in sessions],
+        'se': [s['soc_end'] for s in sessions],
+        'eg': [s['energy_from_grid'] for s in sessions],
+        'eh': [s['energy_added_hvb'] for s in sessions],
+        'c': [s['cost'] for s in sessions],
+        'ld': locations,
+        'l': location_codes,
+        'la': [s['latitude'] for s in sessions],
+        'lo': [s['longitude'] for s in sessions],
+        'p': power,
+        'po': offsets,
+        'bs': block_starts,
+        'be': block_ends,
+        'm': [s['mileage'] for s in sessions],
+        'pd': providers,
+        'pr': provider_codes,
+        'est': [int(s['using_estimated_energy']) for s in sessions],
+    }
+    if not compress:
+        return payload
+    compressed = zlib.compress(jsonio.dumps(payload).encode(), 6)
+    return {'v': WIRE_FORMAT_VERSION, 'z': base64.b64encode(compressed).decode('ascii')}
+
+def decode_sessions(payload):
+    """Decode a payload of encode_sessions back into the session dicts of process_data."""
+    if not payload:
+        return []
+    if payload.get('v') != WIRE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported session wire format version {payload.get('v')}, expected {WIRE_FORMAT_VERSION}")
+    if 'z' in payload:
+        payload = jsonio.loads(zlib.decompress(base64.b64decode(payload['z'])))
+
+    locations = payload['ld']
+    providers = payload['pd']
+    power = [p / POWER_SCALE for p in payload['p']]
+    offsets = payload['po']
+    sessions = []
+    rows = zip(payload['ts'], payload['te'], payload['ss'], payload['se'], payload['eg'], payload['eh'], payload['c'],
+               payload['l'], payload['la'], payload['lo'], offsets, offsets[1:], payload['m'], payload['pr'], payload['est'])
+    for start, end, soc_start, soc_end, energy_from_grid, energy_added_hvb, cost, location, latitude, longitude, power_start, power_end, mileage, provider, estimated in rows:
+        start_time = from_epoch(start)
+        end_time = from_epoch(end)
+        grid_power_start = power[power_start:power_end]
+        block_offsets = [
+            [start_offset, end_offset] if start_offset is not None else None
+            for start_offset, end_offset in zip(payload['bs'][power_start:power_end], payload['be'][power_start:power_end])
+        ]
+        sessions.append({
+            'start_time': start_time,
+            'end_time': end_time,
+            'soc_start': soc_start,
+            'soc_end': soc_end,
+            'energy_from_grid': energy_from_grid,
+            'energy_added_hvb': energy_added_hvb,
+            'cost': cost,
+            'efficiency': energy_added_hvb / energy_from_grid if energy_from_grid else 0,
+            'location': locations[location],
+            'latitude': latitude,
+            'longitude': longitude,
+            'avg_power': sum(grid_power_start) / max(len(grid_power_start), 1),
+            'grid_power_start': grid_power_start,
+            'block_offsets': block_offsets,
+            'mileage': mileage,
+            'session_time_minutes': (end - start) / 60,
+            'provider': providers[provider],
+            'using_estimated_energy': bool(estimated)
+        })
+    return sessions